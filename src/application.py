@@ -7,14 +7,16 @@
 """
 
 import os
-import time
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Optional, Set, Tuple, Sequence
 
-from .config import ConfigManager
+from .config import ConfigManager, LogFileSpec
 from .log_monitor import LogMonitor
 from .telegram_notifier import NotificationManager
-from .task_scheduler import TaskScheduler, ServiceManager
+from .task_scheduler import SingleTaskScheduler, ServiceManager, FileChangeWatcher
+
+__all__ = ["Application"]
 
 logger = logging.getLogger("tg_notification")
 
@@ -32,7 +34,12 @@ class Application:
         self.log_monitor = None
         self.notification_manager = None
         self.scheduler = None
+        self.watcher = None
         self.service_manager = ServiceManager()
+        # 定时任务和文件监听线程都会检查日志，需要串行化对日志监控器的访问
+        self._monitor_lock = threading.Lock()
+        # 从关键词配置提取的结果缓存: (关键词配置, 日志配置列表, 监听路径列表)
+        self._log_configs_cache = (None, (), [])
     
     def initialize(self) -> bool:
         """
@@ -41,6 +48,10 @@ class Application:
         Returns:
             是否成功初始化
         """
+        # 组件已初始化时无需重复初始化
+        if self.log_monitor is not None and self.notification_manager is not None:
+            return True
+        
         try:
             # 验证配置
             logger.info("正在验证配置...")
@@ -50,22 +61,32 @@ class Application:
             
             # 初始化日志监控器
             logger.info("正在初始化日志监控器...")
-            keyword_config = self.config_manager.get_keyword_config()
-            log_configs = keyword_config.get("log_files", [])
+            log_configs, _ = self._get_log_configs()
             self.log_monitor = LogMonitor(log_configs)
             
             # 初始化通知管理器
             logger.info("正在初始化通知管理器...")
-            telegram_config = self.config_manager.get_telegram_config()
-            self.notification_manager = NotificationManager(telegram_config)
+            self._ensure_notification_manager()
             
             logger.info("应用初始化完成")
             return True
             
         except Exception as e:
-            logger.error(f"应用初始化失败: {e}")
+            logger.error("应用初始化失败: %s", e)
             return False
     
+    def _ensure_notification_manager(self) -> NotificationManager:
+        """
+        获取通知管理器，尚未创建时根据Telegram配置创建
+        
+        Returns:
+            通知管理器
+        """
+        if self.notification_manager is None:
+            telegram_config = self.config_manager.get_telegram_config()
+            self.notification_manager = NotificationManager(telegram_config)
+        return self.notification_manager
+    
     def _validate_configs(self) -> bool:
         """
         验证配置
@@ -87,32 +108,92 @@ class Application:
             return True
             
         except Exception as e:
-            logger.error(f"配置验证失败: {e}")
+            logger.error("配置验证失败: %s", e)
             return False
     
+    def _dispatch_matches(self, matches: List[Dict[str, Any]]):
+        """
+        将匹配结果加入通知队列，由通知管理器的发送线程异步发送
+        
+        Args:
+            matches: 匹配的日志信息列表
+        """
+        if not matches:
+            return
+        
+        logger.info("发现 %d 个匹配项", len(matches))
+        
+        # 批量加入通知队列后立即返回，日志检查不需要等待网络请求完成
+        queued_count = self.notification_manager.add_notifications(matches)
+        logger.info("已将 %d 条通知加入发送队列", queued_count)
+    
+    def _flush_notifications(self):
+        """守护进程fork前发送完首次检查产生的通知，父进程在fork后会直接退出"""
+        if self.notification_manager is not None:
+            self.notification_manager.flush()
+    
+    def _get_log_configs(self, reload: bool = False) -> Tuple[Sequence[LogFileSpec], List[str]]:
+        """
+        获取日志配置列表和需要监听的日志路径
+        
+        Args:
+            reload: 是否检查配置文件变化并重新加载
+            
+        Returns:
+            (日志配置列表, 日志路径列表)
+        """
+        keyword_config = self.config_manager.get_keyword_config(reload)
+        
+        # 配置未变化时配置缓存返回同一个字典对象，直接复用上次提取的结果
+        cache = self._log_configs_cache
+        if keyword_config is not cache[0]:
+            log_configs = keyword_config.get("log_files", ())
+            watch_paths = [log_file.path for log_file in log_configs if log_file.path]
+            cache = (keyword_config, log_configs, watch_paths)
+            self._log_configs_cache = cache
+        
+        return cache[1], cache[2]
+    
     def _monitoring_task(self):
         """日志监控任务"""
         try:
-            # 获取关键词配置（用于检查新文件）
-            keyword_config = self.config_manager.get_keyword_config(True)  # 强制重新加载配置
-            log_configs = keyword_config.get("log_files", [])
+            # 获取关键词配置（用于检查新文件），检查配置文件是否有变化
+            log_configs, _ = self._get_log_configs(True)
             
-            # 检查日志，传入配置以便检查新文件
-            matches = self.log_monitor.check_logs(log_configs)
+            with self._monitor_lock:
+                # 检查日志，传入配置以便检查新文件
+                matches = self.log_monitor.check_logs(log_configs)
+                self._dispatch_matches(matches)
+        
+        except Exception as e:
+            logger.error("监控任务执行失败: %s", e)
+    
+    def _get_watch_paths(self) -> List[str]:
+        """
+        获取需要监听变更的日志路径
+        
+        Returns:
+            配置中的日志路径列表（可包含通配符）
+        """
+        _, watch_paths = self._get_log_configs(True)
+        return watch_paths
+    
+    def _process_changed_files(self, changed_paths: Set[str]):
+        """
+        处理文件监听器报告的变更，只检查发生变化的日志文件
+        
+        Args:
+            changed_paths: 发生变化的日志文件路径集合
+        """
+        try:
+            log_configs, _ = self._get_log_configs()
             
-            if matches:
-                logger.info(f"发现 {len(matches)} 个匹配项")
-                
-                # 发送通知
-                for match in matches:
-                    self.notification_manager.add_notification(match)
-                
-                # 处理队列中的通知
-                sent_count = self.notification_manager.process_queue()
-                logger.info(f"已发送 {sent_count} 条通知")
+            with self._monitor_lock:
+                matches = self.log_monitor.check_logs(log_configs, paths=changed_paths)
+                self._dispatch_matches(matches)
         
         except Exception as e:
-            logger.error(f"监控任务执行失败: {e}")
+            logger.error("处理文件变更失败: %s", e)
     
     def start_service(self, interval: int = 60, as_daemon: bool = True) -> bool:
         """
@@ -129,36 +210,41 @@ class Application:
             # 检查服务是否已经在运行
             pid = self.service_manager.check_pid_file()
             if pid and self.service_manager.is_process_running(pid):
-                logger.warning(f"服务已经在运行 (PID: {pid})")
+                logger.warning("服务已经在运行 (PID: %d)", pid)
                 return False
             
             # 如果PID文件存在但进程不存在，则清理PID文件
             if pid:
-                logger.warning(f"发现陈旧的PID文件，进程 (PID: {pid}) 不存在，正在清理")
+                logger.warning("发现陈旧的PID文件，进程 (PID: %d) 不存在，正在清理", pid)
                 self.service_manager.remove_pid_file()
             
-            # 确保配置文件存在且格式正确（提前加载和验证）
-            logger.info("预检查配置文件...")
-            # 强制重新加载配置，确保文件存在且格式正确
-            self.config_manager.get_keyword_config(True)
-            self.config_manager.get_telegram_config(True)
-                    
-            # 初始化应用
+            # 初始化应用，配置文件的加载和验证在初始化时完成
             if not self.initialize():
                 logger.error("应用初始化失败，无法启动服务")
                 return False
             
-            # 创建调度器
-            self.scheduler = TaskScheduler(interval)
+            # 创建调度器，只有监控一个任务，使用单任务调度器直接循环执行
+            # 在事件驱动模式下作为兜底的定期全量检查
+            self.scheduler = SingleTaskScheduler(self._monitoring_task, interval, "日志监控")
             
-            # 添加监控任务
-            self.scheduler.add_task(self._monitoring_task, "日志监控")
+            # 如果可用，使用文件变更事件驱动日志检查，降低通知延迟
+            if FileChangeWatcher.is_available():
+                self.watcher = FileChangeWatcher(self._get_watch_paths, self._process_changed_files)
+                logger.info("已启用文件变更事件监听")
+            else:
+                logger.warning("未安装watchfiles，仅使用定时轮询检查日志")
             
-            # 启动服务
-            return self.service_manager.start(self.scheduler, as_daemon)
+            # 启动服务；守护进程模式下只有守护进程本身会从start返回，此时服务已收到停止信号
+            started = self.service_manager.start(self.scheduler, as_daemon, self.watcher,
+                                                 before_fork=self._flush_notifications)
+            if as_daemon and started and self.notification_manager is not None:
+                # 退出前在限定时间内发送完队列中的通知
+                self.notification_manager.close(drain=True)
+                self.notification_manager = None
+            return started
             
         except Exception as e:
-            logger.error(f"启动服务时发生错误: {e}")
+            logger.error("启动服务时发生错误: %s", e)
             return False
     
     def stop_service(self) -> bool:
@@ -174,41 +260,43 @@ class Application:
             try:
                 import os
                 import signal
-                logger.info(f"正在停止守护进程 (PID: {pid})...")
+                logger.info("正在停止守护进程 (PID: %d)...", pid)
                 os.kill(pid, signal.SIGTERM)
                 
-                # 等待进程结束
-                for _ in range(10):  # 最多等待10秒
-                    if not self.service_manager.is_process_running(pid):
-                        break
-                    time.sleep(1)
-                
-                if not self.service_manager.is_process_running(pid):
-                    logger.info(f"守护进程 (PID: {pid}) 已停止")
+                # 等待进程结束，最多等待10秒
+                if self.service_manager.wait_for_process_exit(pid, 10):
+                    logger.info("守护进程 (PID: %d) 已停止", pid)
                     self.service_manager.remove_pid_file()
                     return True
                 else:
-                    logger.warning(f"守护进程 (PID: {pid}) 未能在给定时间内停止")
+                    logger.warning("守护进程 (PID: %d) 未能在给定时间内停止", pid)
                     # 强制停止
                     try:
                         os.kill(pid, signal.SIGKILL)
-                        logger.info(f"已强制停止守护进程 (PID: {pid})")
+                        logger.info("已强制停止守护进程 (PID: %d)", pid)
                         self.service_manager.remove_pid_file()
                         return True
                     except Exception as e:
-                        logger.error(f"强制停止守护进程失败: {e}")
+                        logger.error("强制停止守护进程失败: %s", e)
                         return False
             except ProcessLookupError:
                 # 进程不存在，只需删除PID文件
-                logger.info(f"进程 (PID: {pid}) 不存在，清理PID文件")
+                logger.info("进程 (PID: %d) 不存在，清理PID文件", pid)
                 self.service_manager.remove_pid_file()
                 return True
             except Exception as e:
-                logger.error(f"停止守护进程失败: {e}")
+                logger.error("停止守护进程失败: %s", e)
                 return False
         
         # 如果没有PID文件或进程，则尝试停止当前的服务
-        return self.service_manager.stop()
+        stopped = self.service_manager.stop()
+        
+        # 服务停止后不再发送通知，关闭与Telegram API的连接
+        if self.notification_manager is not None:
+            self.notification_manager.close()
+            self.notification_manager = None
+        
+        return stopped
     
     def get_service_status(self) -> Dict[str, Any]:
         """
@@ -230,13 +318,12 @@ class Application:
             是否发送成功
         """
         try:
-            # 初始化必要组件
-            telegram_config = self.config_manager.get_telegram_config()
-            notification_manager = NotificationManager(telegram_config)
+            # 复用已有的通知管理器及其HTTP连接
+            notification_manager = self._ensure_notification_manager()
             
             # 发送测试通知
             return notification_manager.test_notification(message)
             
         except Exception as e:
-            logger.error(f"发送测试通知失败: {e}")
+            logger.error("发送测试通知失败: %s", e)
             return False 
\ No newline at end of file
@@ -7,16 +7,110 @@
 """
 
 import os
+import sys
 import logging
+import threading
 import yaml
-import glob
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+try:
+    # 优先使用libyaml实现的C解析器，解析速度比纯Python实现快数倍
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+__all__ = ["LogFileSpec", "ConfigLoader", "ConfigManager"]
 
 logger = logging.getLogger("tg_notification")
 
+# 项目根目录（src的上一级目录），模块导入时计算一次
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _intern_keys(data: Any) -> Any:
+    """
+    驻留配置字典中的字符串键，使各配置文件中相同的键共享同一个字符串对象
+    
+    Args:
+        data: YAML解析得到的配置数据
+        
+    Returns:
+        键已驻留的配置数据
+    """
+    if isinstance(data, dict):
+        return {sys.intern(key) if isinstance(key, str) else key: _intern_keys(value)
+                for key, value in data.items()}
+    if isinstance(data, list):
+        return [_intern_keys(item) for item in data]
+    return data
+
+@dataclass(slots=True, frozen=True)
+class LogFileSpec:
+    """单个日志文件的监控配置"""
+    
+    path: Optional[str]
+    keywords: Tuple[Any, ...] = ()
+    use_regex: bool = False
+    # 多行配置以只读映射保存，与冻结的其他字段一样不能在加载后被修改
+    multiline: Optional[Mapping[str, Any]] = None
+    drop_page_cache: bool = False
+    
+    @classmethod
+    def from_dict(cls, log_file: Dict[str, Any]) -> "LogFileSpec":
+        """
+        从YAML解析得到的字典创建监控配置
+        
+        Args:
+            log_file: 日志文件配置字典
+            
+        Returns:
+            日志文件监控配置
+        """
+        multiline = log_file.get("multiline")
+        if isinstance(multiline, dict):
+            multiline = MappingProxyType(dict(multiline))
+        elif multiline is not None:
+            logger.warning("忽略格式错误的多行日志配置: %s", multiline)
+            multiline = None
+        
+        return cls(
+            path=log_file.get("path"),
+            keywords=tuple(log_file.get("keywords") or ()),
+            use_regex=bool(log_file.get("use_regex", False)),
+            multiline=multiline,
+            drop_page_cache=bool(log_file.get("drop_page_cache", False))
+        )
+
+def _freeze_log_files(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将关键词配置中的log_files列表转换为LogFileSpec元组（原地修改，重复调用无副作用）
+    
+    Args:
+        config: 关键词配置字典
+        
+    Returns:
+        转换后的关键词配置字典
+    """
+    log_files = config.get("log_files")
+    if isinstance(log_files, list):
+        specs = []
+        for log_file in log_files:
+            if isinstance(log_file, dict):
+                specs.append(LogFileSpec.from_dict(log_file))
+            else:
+                logger.warning("忽略格式错误的日志文件配置: %s", log_file)
+        config["log_files"] = tuple(specs)
+    return config
+
 class ConfigLoader:
     """配置加载器，用于读取YAML配置文件"""
     
+    # 需要解析的文件数达到该值时才使用线程池并行解析，文件较少时线程开销得不偿失
+    PARALLEL_PARSE_MIN_FILES = 4
+    PARALLEL_PARSE_MAX_WORKERS = 8
+    
     def __init__(self, config_dir: str):
         """
         初始化配置加载器
@@ -26,17 +120,32 @@ class ConfigLoader:
         """
         # 确保config_dir是绝对路径，以防守护进程模式下工作目录变更
         if not os.path.isabs(config_dir):
-            # 获取程序主目录（src的上一级目录）
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            self.config_dir = os.path.abspath(os.path.join(base_dir, config_dir))
+            self.config_dir = os.path.abspath(os.path.join(_BASE_DIR, config_dir))
         else:
             self.config_dir = config_dir
             
-        logger.debug(f"配置目录路径: {self.config_dir}")
+        logger.debug("配置目录路径: %s", self.config_dir)
+        # 缓存格式: {缓存键: (文件指纹, 配置字典)}
         self._config_cache = {}
+        # 目录合并时单个文件的解析缓存: {文件路径: (文件指纹, 配置字典)}
+        self._file_cache = {}
+        
+        # 项目根目录
+        self.base_dir = _BASE_DIR
+    
+    @staticmethod
+    def _get_file_fingerprint(file_path: str) -> Tuple[int, int]:
+        """
+        获取文件指纹（修改时间和大小），用于判断文件是否需要重新解析
         
-        # 获取项目根目录
-        self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            (修改时间纳秒, 文件大小)
+        """
+        stat_result = os.stat(file_path)
+        return stat_result.st_mtime_ns, stat_result.st_size
     
     def load_config(self, config_name: str) -> Dict[str, Any]:
         """
@@ -54,29 +163,98 @@ class ConfigLoader:
         """
         config_path = os.path.join(self.config_dir, f"{config_name}.yml")
         
-        logger.debug(f"尝试加载配置文件: {config_path}")
-        
-        if not os.path.exists(config_path):
-            logger.error(f"配置文件不存在: {config_path}")
-            raise FileNotFoundError(f"找不到配置文件: {config_path}")
+        logger.debug("尝试加载配置文件: %s", config_path)
         
         try:
             with open(config_path, 'r', encoding='utf-8') as file:
-                config = yaml.safe_load(file)
+                # 先获取指纹再读取，读取期间文件若被修改，下次检查时会重新解析
+                stat_result = os.fstat(file.fileno())
+                fingerprint = (stat_result.st_mtime_ns, stat_result.st_size)
+                config = _intern_keys(yaml.load(file, Loader=YamlLoader))
                 if config is None:
-                    logger.error(f"配置文件为空或格式错误: {config_path}")
+                    logger.error("配置文件为空或格式错误: %s", config_path)
                     raise ValueError(f"配置文件为空或格式错误: {config_path}")
                     
-                self._config_cache[config_name] = config
-                logger.debug(f"已加载配置文件: {config_path}")
+                self._config_cache[config_name] = (fingerprint, config)
+                logger.debug("已加载配置文件: %s", config_path)
                 return config
+        except FileNotFoundError:
+            # 直接依赖open()判断文件是否存在，避免额外的stat调用和检查与打开之间的竞态
+            logger.error("配置文件不存在: %s", config_path)
+            raise FileNotFoundError(f"找不到配置文件: {config_path}")
         except yaml.YAMLError as e:
-            logger.error(f"配置文件解析错误: {config_path}, 错误: {e}")
+            logger.error("配置文件解析错误: %s, 错误: %s", config_path, e)
             raise ValueError(f"配置文件解析错误: {config_path}, 错误: {e}")
         except Exception as e:
-            logger.error(f"读取配置文件时发生错误: {config_path}, 错误: {e}")
+            logger.error("读取配置文件时发生错误: %s, 错误: %s", config_path, e)
             raise
     
+    def _load_directory_file(self, yml_file: str, fingerprint: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+        """
+        解析目录中的单个配置文件，文件未变化时复用上次的解析结果
+        
+        Args:
+            yml_file: 配置文件路径
+            fingerprint: 文件指纹，为None时不使用缓存
+            
+        Returns:
+            配置字典，文件为空时返回None
+        """
+        cached = self._file_cache.get(yml_file)
+        if fingerprint is not None and cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        
+        config = self._parse_yaml_file(yml_file)
+        
+        if fingerprint is not None:
+            self._file_cache[yml_file] = (fingerprint, config)
+        return config
+    
+    @staticmethod
+    def _parse_yaml_file(yml_file: str) -> Optional[Dict[str, Any]]:
+        """
+        读取并解析单个YAML文件
+        
+        Args:
+            yml_file: 配置文件路径
+            
+        Returns:
+            配置字典，文件为空时返回None
+        """
+        with open(yml_file, 'r', encoding='utf-8') as file:
+            return _intern_keys(yaml.load(file, Loader=YamlLoader))
+    
+    def _prefetch_directory_files(self, file_fingerprints: Dict[str, Tuple[int, int]]):
+        """
+        使用线程池并行解析目录中发生变化的配置文件，结果写入单文件解析缓存
+        
+        Args:
+            file_fingerprints: {文件路径: 文件指纹}
+        """
+        stale_files = []
+        for yml_file, fingerprint in file_fingerprints.items():
+            cached = self._file_cache.get(yml_file)
+            if cached is None or cached[0] != fingerprint:
+                stale_files.append(yml_file)
+        
+        if len(stale_files) < self.PARALLEL_PARSE_MIN_FILES:
+            return
+        
+        def parse(yml_file: str):
+            try:
+                return self._parse_yaml_file(yml_file), True
+            except Exception:
+                # 解析失败的文件留给合并阶段重新读取并记录错误
+                return None, False
+        
+        max_workers = min(self.PARALLEL_PARSE_MAX_WORKERS, len(stale_files))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(parse, stale_files))
+        
+        for yml_file, (config, ok) in zip(stale_files, results):
+            if ok:
+                self._file_cache[yml_file] = (file_fingerprints[yml_file], config)
+    
     def load_configs_from_directory(self, directory_name: str, config_type: str) -> Dict[str, Any]:
         """
         从指定目录加载所有配置文件并合并
@@ -90,76 +268,113 @@ class ConfigLoader:
         """
         # 首先尝试从项目根目录下的directory_name目录加载
         directory_path = os.path.join(self.base_dir, directory_name)
-        logger.debug(f"尝试从项目根目录中加载配置: {directory_path}")
+        logger.debug("尝试从项目根目录中加载配置: %s", directory_path)
         
         # 如果根目录下找不到，则尝试从config目录下寻找
         if not os.path.exists(directory_path) or not os.path.isdir(directory_path):
-            logger.debug(f"在项目根目录中未找到配置目录: {directory_path}")
+            logger.debug("在项目根目录中未找到配置目录: %s", directory_path)
             # 尝试从配置目录下寻找
             directory_path = os.path.join(self.config_dir, directory_name)
-            logger.debug(f"尝试从配置目录中加载配置: {directory_path}")
+            logger.debug("尝试从配置目录中加载配置: %s", directory_path)
         
         if not os.path.exists(directory_path):
-            logger.warning(f"配置目录不存在: {directory_path}")
+            logger.warning("配置目录不存在: %s", directory_path)
             # 尝试创建目录
             try:
                 os.makedirs(directory_path, exist_ok=True)
-                logger.info(f"已创建配置目录: {directory_path}")
+                logger.info("已创建配置目录: %s", directory_path)
             except Exception as e:
-                logger.error(f"创建配置目录失败: {directory_path}, 错误: {e}")
+                logger.error("创建配置目录失败: %s, 错误: %s", directory_path, e)
             return {}
         
-        # 查找目录中所有.yml文件
-        yml_files = glob.glob(os.path.join(directory_path, "*.yml"))
+        # 查找目录中所有.yml文件，scandir一次遍历即可得到文件名和完整路径
+        # 按文件名排序，保证合并顺序稳定
+        with os.scandir(directory_path) as entries:
+            yml_entries = sorted(
+                (entry for entry in entries if entry.name.endswith(".yml") and entry.is_file()),
+                key=lambda entry: entry.name
+            )
         
-        if not yml_files:
-            logger.warning(f"配置目录中没有找到YAML文件: {directory_path}")
+        if not yml_entries:
+            logger.warning("配置目录中没有找到YAML文件: %s", directory_path)
             return {}
         
+        # 计算目录指纹，所有文件都未变化时直接返回缓存的合并结果
+        cache_key = f"{config_type}_directory_config"
+        file_fingerprints = {}
+        for entry in yml_entries:
+            try:
+                stat_result = entry.stat()
+                file_fingerprints[entry.path] = (stat_result.st_mtime_ns, stat_result.st_size)
+            except OSError as e:
+                logger.error("获取配置文件状态失败: %s, 错误: %s", entry.path, e)
+        directory_fingerprint = (directory_path, tuple(sorted(file_fingerprints.items())))
+        
+        cached = self._config_cache.get(cache_key)
+        if cached is not None and cached[0] == directory_fingerprint:
+            return cached[1]
+        
+        # 变化的文件较多时先并行解析，合并仍按文件名顺序串行进行以保证结果稳定
+        self._prefetch_directory_files(file_fingerprints)
+        
         # 初始化合并配置
         merged_config = {"log_files": []}
         
         # 记录配置项的来源文件，用于日志和调试
         config_sources = {}
         
+        # 调试日志开关只判断一次，避免在合并循环中重复构造日志
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
         # 加载并合并所有配置文件
-        for yml_file in yml_files:
-            file_name = os.path.basename(yml_file)
-            logger.debug(f"处理配置文件: {file_name}")
+        for entry in yml_entries:
+            yml_file = entry.path
+            file_name = entry.name
+            if debug_enabled:
+                logger.debug("处理配置文件: %s", file_name)
             
             try:
-                with open(yml_file, 'r', encoding='utf-8') as file:
-                    config = yaml.safe_load(file)
-                    
-                    if config is None:
-                        logger.warning(f"配置文件为空或格式错误: {yml_file}")
-                        continue
-                    
-                    # 合并log_files列表
-                    if "log_files" in config and isinstance(config["log_files"], list):
-                        for log_file in config["log_files"]:
-                            merged_config["log_files"].append(log_file)
-                            config_sources[log_file.get("path", "unknown")] = file_name
-                    
-                    # 合并log_reader配置（使用最后一个有效配置）
-                    if "log_reader" in config and isinstance(config["log_reader"], dict):
-                        merged_config["log_reader"] = config["log_reader"]
+                config = self._load_directory_file(yml_file, file_fingerprints.get(yml_file))
+                
+                if config is None:
+                    logger.warning("配置文件为空或格式错误: %s", yml_file)
+                    continue
+                
+                # 合并log_files列表
+                log_files = config.get("log_files")
+                if isinstance(log_files, list):
+                    merged_config["log_files"].extend(log_files)
+                    # 配置项来源只用于调试日志
+                    if debug_enabled:
+                        for log_file in log_files:
+                            if isinstance(log_file, dict):
+                                config_sources[log_file.get("path", "unknown")] = file_name
+                
+                # 合并log_reader配置（使用最后一个有效配置）
+                log_reader = config.get("log_reader")
+                if isinstance(log_reader, dict):
+                    merged_config["log_reader"] = log_reader
+                    if debug_enabled:
                         config_sources["log_reader"] = file_name
                 
-                logger.debug(f"已合并配置文件: {yml_file}")
+                if debug_enabled:
+                    logger.debug("已合并配置文件: %s", yml_file)
             
             except yaml.YAMLError as e:
-                logger.error(f"配置文件解析错误: {yml_file}, 错误: {e}")
+                logger.error("配置文件解析错误: %s, 错误: %s", yml_file, e)
             except Exception as e:
-                logger.error(f"读取配置文件时发生错误: {yml_file}, 错误: {e}")
+                logger.error("读取配置文件时发生错误: %s, 错误: %s", yml_file, e)
         
-        # 缓存合并后的配置
-        cache_key = f"{config_type}_directory_config"
-        self._config_cache[cache_key] = merged_config
+        # 转换为不可变的监控配置记录，随合并结果一起缓存
+        _freeze_log_files(merged_config)
+        
+        # 缓存合并后的配置及目录指纹
+        self._config_cache[cache_key] = (directory_fingerprint, merged_config)
         
         # 记录合并结果
-        logger.info(f"已从目录 {directory_path} 合并 {len(yml_files)} 个配置文件，包含 {len(merged_config['log_files'])} 个日志监控项")
-        logger.debug(f"配置项来源: {config_sources}")
+        logger.info("已从目录 %s 合并 %d 个配置文件，包含 %d 个日志监控项", directory_path, len(yml_entries), len(merged_config['log_files']))
+        if debug_enabled:
+            logger.debug("配置项来源: %s", config_sources)
         
         return merged_config
     
@@ -174,10 +389,22 @@ class ConfigLoader:
         Returns:
             配置字典
         """
-        if reload or config_name not in self._config_cache:
+        cached = self._config_cache.get(config_name)
+        if cached is None:
             return self.load_config(config_name)
         
-        return self._config_cache[config_name]
+        if reload:
+            # 只有文件的修改时间或大小发生变化时才重新解析
+            config_path = os.path.join(self.config_dir, f"{config_name}.yml")
+            try:
+                fingerprint = self._get_file_fingerprint(config_path)
+            except OSError:
+                fingerprint = None
+            
+            if fingerprint != cached[0]:
+                return self.load_config(config_name)
+        
+        return cached[1]
     
     def get_configs_from_directory(self, directory_name: str, config_type: str, reload: bool = False) -> Dict[str, Any]:
         """
@@ -193,21 +420,26 @@ class ConfigLoader:
         """
         cache_key = f"{config_type}_directory_config"
         
+        # 目录加载会比较文件指纹，内容未变化时直接返回缓存
         if reload or cache_key not in self._config_cache:
             return self.load_configs_from_directory(directory_name, config_type)
         
-        return self._config_cache[cache_key]
+        return self._config_cache[cache_key][1]
 
 class ConfigManager:
     """配置管理器，单例模式"""
     
     _instance = None
+    _lock = threading.Lock()
     
     def __new__(cls, *args, **kwargs):
-        """确保只有一个实例"""
+        """确保只有一个实例（双重检查加锁，保证多线程下也只创建一次）"""
         if cls._instance is None:
-            cls._instance = super(ConfigManager, cls).__new__(cls)
-            cls._instance._initialized = False
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(ConfigManager, cls).__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self, config_dir: str = "config"):
@@ -217,15 +449,21 @@ class ConfigManager:
         Args:
             config_dir: 配置文件目录
         """
-        # 避免重复初始化
+        # 避免重复初始化，已初始化时不加锁直接返回
         if self._initialized:
             return
+        
+        with self._lock:
+            if self._initialized:
+                return
             
-        self.config_loader = ConfigLoader(config_dir)
-        self._keyword_config = None
-        self._telegram_config = None
-        self._keyword_configs_directory = "keyword_config"  # 默认关键词配置目录
-        self._initialized = True
+            self.config_loader = ConfigLoader(config_dir)
+            self._keyword_config = None
+            self._telegram_config = None
+            self._keyword_configs_directory = "keyword_config"  # 默认关键词配置目录
+            # 定时任务和文件监听线程会同时读取配置，加载过程需要串行化
+            self._config_lock = threading.RLock()
+            self._initialized = True
     
     def get_keyword_config(self, reload: bool = False) -> Dict[str, Any]:
         """
@@ -240,31 +478,32 @@ class ConfigManager:
         Returns:
             关键词配置字典
         """
-        # 首先尝试从目录中加载多个配置文件
-        try:
-            self._keyword_config = self.config_loader.get_configs_from_directory(
-                self._keyword_configs_directory, "keyword", reload
-            )
-            
-            # 如果找到了配置文件并且包含log_files条目，则直接返回
-            if self._keyword_config and self._keyword_config.get("log_files"):
-                logger.debug(f"已从目录 {self._keyword_configs_directory} 加载配置")
-                return self._keyword_config
-                
-            # 如果没有找到配置文件，则尝试从config目录中加载单一配置文件
-            logger.info(f"未从目录 {self._keyword_configs_directory} 加载到配置，尝试加载单一配置文件")
-            self._keyword_config = self.config_loader.get_config("keyword_config", reload)
-            return self._keyword_config
-        except Exception as e:
-            # 如果从目录加载失败，回退到原有的单一文件加载方式
-            logger.warning(f"从目录加载关键词配置失败: {e}，尝试加载单一配置文件")
+        with self._config_lock:
+            # 首先尝试从目录中加载多个配置文件
             try:
-                self._keyword_config = self.config_loader.get_config("keyword_config", reload)
+                self._keyword_config = self.config_loader.get_configs_from_directory(
+                    self._keyword_configs_directory, "keyword", reload
+                )
+                
+                # 如果找到了配置文件并且包含log_files条目，则直接返回
+                if self._keyword_config and self._keyword_config.get("log_files"):
+                    logger.debug("已从目录 %s 加载配置", self._keyword_configs_directory)
+                    return self._keyword_config
+                    
+                # 如果没有找到配置文件，则尝试从config目录中加载单一配置文件
+                logger.info("未从目录 %s 加载到配置，尝试加载单一配置文件", self._keyword_configs_directory)
+                self._keyword_config = _freeze_log_files(self.config_loader.get_config("keyword_config", reload))
                 return self._keyword_config
-            except Exception as load_e:
-                logger.error(f"加载关键词配置失败: {load_e}")
-                # 返回空配置而不是抛出异常，以避免程序崩溃
-                return {"log_files": []}
+            except Exception as e:
+                # 如果从目录加载失败，回退到原有的单一文件加载方式
+                logger.warning("从目录加载关键词配置失败: %s，尝试加载单一配置文件", e)
+                try:
+                    self._keyword_config = _freeze_log_files(self.config_loader.get_config("keyword_config", reload))
+                    return self._keyword_config
+                except Exception as load_e:
+                    logger.error("加载关键词配置失败: %s", load_e)
+                    # 返回空配置而不是抛出异常，以避免程序崩溃
+                    return {"log_files": ()}
     
     def get_telegram_config(self, reload: bool = False) -> Dict[str, Any]:
         """
@@ -276,10 +515,11 @@ class ConfigManager:
         Returns:
             Telegram配置字典
         """
-        if reload or self._telegram_config is None:
-            self._telegram_config = self.config_loader.get_config("telegram_config", reload)
-        
-        return self._telegram_config
+        with self._config_lock:
+            if reload or self._telegram_config is None:
+                self._telegram_config = self.config_loader.get_config("telegram_config", reload)
+            
+            return self._telegram_config
     
     def validate_keyword_config(self) -> bool:
         """
@@ -301,17 +541,17 @@ class ConfigManager:
                 return False
                 
             for log_file in config["log_files"]:
-                if "path" not in log_file:
+                if log_file.path is None:
                     logger.error("日志文件缺少路径配置")
                     return False
                     
-                if "keywords" not in log_file or not log_file["keywords"]:
-                    logger.warning(f"日志文件没有关键词配置: {log_file.get('path')}")
+                if not log_file.keywords:
+                    logger.warning("日志文件没有关键词配置: %s", log_file.path)
             
             return True
             
         except Exception as e:
-            logger.error(f"关键词配置验证失败: {e}")
+            logger.error("关键词配置验证失败: %s", e)
             return False
     
     def validate_telegram_config(self) -> bool:
@@ -340,7 +580,7 @@ class ConfigManager:
             return True
             
         except Exception as e:
-            logger.error(f"Telegram配置验证失败: {e}")
+            logger.error("Telegram配置验证失败: %s", e)
             return False
 
     def set_keyword_configs_directory(self, directory_name: str):
@@ -350,6 +590,7 @@ class ConfigManager:
         Args:
             directory_name: 目录名称，相对于config_dir
         """
-        self._keyword_configs_directory = directory_name
-        # 重置配置缓存
-        self._keyword_config = None 
\ No newline at end of file
+        with self._config_lock:
+            self._keyword_configs_directory = directory_name
+            # 重置配置缓存
+            self._keyword_config = None 
\ No newline at end of file
@@ -9,55 +9,362 @@
 import os
 import time
 import re
+import hashlib
 import glob
+import fnmatch
 import logging
-from typing import Dict, List, Set, Optional, Any, Tuple
+import functools
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, Set, Optional, Any, Tuple, Sequence, Pattern
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_parse
+
+try:
+    # RE2基于自动机实现，匹配时间与行长度线性相关，不会出现回溯导致的性能问题
+    import re2
+except ImportError:
+    re2 = None
+
+from .config import LogFileSpec
 
 logger = logging.getLogger("tg_notification")
 
+# 包含换行符的字符类别
+_NEWLINE_CATEGORIES = frozenset({
+    sre_parse.CATEGORY_SPACE,
+    sre_parse.CATEGORY_NOT_DIGIT,
+    sre_parse.CATEGORY_NOT_WORD,
+    sre_parse.CATEGORY_LINEBREAK,
+})
+
+# 在整块缓冲区和单独一行上含义相同的位置断言：行首、单词边界
+_LINE_LOCAL_AT_CODES = frozenset({
+    sre_parse.AT_BEGINNING,
+    sre_parse.AT_BOUNDARY,
+    sre_parse.AT_NON_BOUNDARY,
+})
+
+def _is_line_local(items, flags: int) -> bool:
+    """
+    检查正则在整块缓冲区上从行首匹配时是否与单独匹配一行的结果相同
+    
+    能匹配换行符的结构会跨越行边界，前后查找和字符串首尾断言能看到相邻的行，这些模式只能逐行匹配。
+    
+    Args:
+        items: sre_parse解析得到的正则结构
+        flags: 当前生效的编译标志
+        
+    Returns:
+        是否只在一行之内匹配
+    """
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            if av == 0x0A:
+                return False
+        elif op == sre_parse.NOT_LITERAL:
+            if av != 0x0A:
+                return False
+        elif op == sre_parse.ANY:
+            if flags & re.DOTALL:
+                return False
+        elif op == sre_parse.IN:
+            negate = False
+            contains_newline = False
+            for item_op, item_av in av:
+                if item_op == sre_parse.NEGATE:
+                    negate = True
+                elif item_op == sre_parse.LITERAL:
+                    contains_newline |= item_av == 0x0A
+                elif item_op == sre_parse.RANGE:
+                    contains_newline |= item_av[0] <= 0x0A <= item_av[1]
+                elif item_op == sre_parse.CATEGORY:
+                    contains_newline |= item_av in _NEWLINE_CATEGORIES
+                else:
+                    return False
+            if contains_newline != negate:
+                return False
+        elif op == sre_parse.AT:
+            if av not in _LINE_LOCAL_AT_CODES:
+                return False
+        elif op == sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub_items = av
+            if not _is_line_local(sub_items, (flags | add_flags) & ~del_flags):
+                return False
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) or op.name == "POSSESSIVE_REPEAT":
+            if not _is_line_local(av[2], flags):
+                return False
+        elif op.name == "ATOMIC_GROUP":
+            if not _is_line_local(av, flags):
+                return False
+        elif op == sre_parse.BRANCH:
+            if not all(_is_line_local(branch, flags) for branch in av[1]):
+                return False
+        elif op == sre_parse.GROUPREF_EXISTS:
+            _, yes_items, no_items = av
+            if not _is_line_local(yes_items, flags):
+                return False
+            if no_items is not None and not _is_line_local(no_items, flags):
+                return False
+        elif op != sre_parse.GROUPREF:
+            # 前后查找等其他结构能看到相邻的行
+            return False
+    return True
+
+@functools.lru_cache(maxsize=64)
+def _compile_multiline_scan_pattern(pattern: bytes, flags: int) -> Optional[Pattern]:
+    """
+    将多行日志的起始模式编译为可在整块缓冲区上扫描的多行模式，相同模式只编译一次
+    
+    Args:
+        pattern: 原始起始模式
+        flags: 原始模式的编译标志
+        
+    Returns:
+        锚定在行首的多行模式，模式可能跨行匹配或无法转换时返回None
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception as e:
+        logger.debug("多行匹配模式无法用于整块扫描，将逐行匹配: %s", e)
+        return None
+    if not _is_line_local(parsed, parsed.state.flags):
+        logger.debug("多行匹配模式可能跨行匹配，将逐行匹配: %r", pattern)
+        return None
+    
+    try:
+        return re.compile(b"^(?:" + pattern + b")", flags | re.MULTILINE)
+    except re.error as e:
+        logger.debug("多行匹配模式无法用于整块扫描，将逐行匹配: %s", e)
+        return None
+
+def _literal_to_bytes(pattern: Pattern, codes: List[int]) -> bytes:
+    """
+    将正则解析得到的字符编码转换为可以在未解码日志上查找的字节串
+    
+    Args:
+        pattern: 字面量所属的正则，字符串正则的字面量按UTF-8编码
+        codes: 字符编码列表
+    
+    Returns:
+        字节串字面量
+    """
+    if isinstance(pattern.pattern, str):
+        return "".join(map(chr, codes)).encode("utf-8")
+    return bytes(codes)
+
+def _get_literal_pattern_bytes(pattern: Pattern) -> Optional[bytes]:
+    """
+    判断正则是否只由普通字符组成，这样的正则等价于字面量查找，可以直接在字节串上匹配
+    
+    Args:
+        pattern: 已编译的正则
+    
+    Returns:
+        正则对应的字节串字面量，正则含有其他结构或忽略大小写时返回None
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    
+    codes = []
+    for op, av in parsed:
+        if op != sre_parse.LITERAL:
+            return None
+        codes.append(av)
+    return _literal_to_bytes(pattern, codes)
+
+def _uses_unicode_classes(pattern: Pattern) -> bool:
+    """
+    判断正则是否使用\\d、\\w、\\s、\\b等字符类别，RE2中它们只匹配ASCII字符，与re模块的结果不同
+    
+    Args:
+        pattern: 已编译的字符串正则
+    
+    Returns:
+        是否使用了字符类别，无法解析时按使用处理
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return True
+    
+    def walk(items) -> bool:
+        for op, av in items:
+            if op == sre_parse.CATEGORY:
+                return True
+            if op == sre_parse.AT and av in (sre_parse.AT_BOUNDARY, sre_parse.AT_NON_BOUNDARY):
+                return True
+            if op == sre_parse.IN:
+                if walk(av):
+                    return True
+                continue
+            # 分组、重复、分支等结构的参数中包含子表达式
+            values = av if isinstance(av, (tuple, list)) else (av,)
+            for value in values:
+                branches = value if isinstance(value, list) else [value]
+                for branch in branches:
+                    if isinstance(branch, sre_parse.SubPattern) and walk(branch):
+                        return True
+        return False
+    
+    return walk(parsed)
+
+def _extract_required_literal(pattern: Pattern, min_length: int = 3) -> Optional[bytes]:
+    """
+    提取正则匹配时必定出现的最长字面量，用于在运行正则前快速排除不可能匹配的行
+    
+    只分析顶层顺序结构中连续的普通字符，遇到分支、重复、字符类等结构即断开，
+    忽略大小写的正则不提取。字符串正则的字面量按UTF-8编码返回。
+    
+    Args:
+        pattern: 已编译的正则
+        min_length: 字面量编码后的最小长度，过短的字面量过滤效果差
+    
+    Returns:
+        必定出现的最长字面量，无法提取时返回None
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    
+    runs = []
+    current = []
+    
+    def walk(items):
+        for op, av in items:
+            # 解码时无效字节会被替换为U+FFFD，原始字节中不一定含有它的UTF-8编码
+            if op == sre_parse.LITERAL and av != 0xFFFD:
+                current.append(av)
+            elif op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+                # 不改变标志的分组，其内容同样必定出现
+                walk(av[3])
+            else:
+                # 其他结构（包括局部修改标志的分组）打断连续的字面量
+                if current:
+                    runs.append(_literal_to_bytes(pattern, current))
+                    current.clear()
+    
+    walk(parsed)
+    if current:
+        runs.append(_literal_to_bytes(pattern, current))
+    
+    longest = max(runs, key=len, default=None)
+    if longest is None or len(longest) < min_length:
+        return None
+    return longest
+
+def _build_literal_automaton(literals: List[bytes]):
+    """
+    为字节串字面量构建Aho-Corasick自动机
+    
+    字符串版本的pyahocorasick无法处理字节串，字面量和日志行都按latin-1映射为等长的字符串
+    
+    Args:
+        literals: 字节串字面量列表
+    
+    Returns:
+        构建好的自动机
+    """
+    automaton = ahocorasick.Automaton()
+    for literal in literals:
+        automaton.add_word(literal.decode("latin-1"), literal)
+    automaton.make_automaton()
+    return automaton
+
+# 当前进程中的日志监控器，fork后需要在子进程中释放它们持有的文件描述符
+_live_monitors = weakref.WeakSet()
+
+def _reset_monitors_after_fork():
+    """fork后在子进程中重置所有日志监控器，此时继承的描述符仍然有效，可以安全关闭"""
+    for monitor in list(_live_monitors):
+        monitor._reset_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_monitors_after_fork)
+
 class LogReader:
     """日志读取器，用于读取和跟踪日志文件"""
     
-    def __init__(self, log_path: str, multiline_config: Optional[Dict[str, Any]] = None):
+    def __init__(self, log_path: str, multiline_config: Optional[Mapping[str, Any]] = None,
+                 multiline_pattern: Optional[Pattern] = None, drop_page_cache: bool = False):
         """
         初始化日志读取器
         
         Args:
             log_path: 日志文件路径
             multiline_config: 多行日志配置，包含类型和模式
+            multiline_pattern: 已编译的多行匹配模式，提供时不再重复编译
+            drop_page_cache: 读取后是否通知内核丢弃已读内容的页缓存
         """
         self.log_path = log_path
         self.last_position = 0
         self.last_inode = None
         self.file_exists = False
         self.multiline_config = multiline_config
-        self.multiline_pattern = None
+        self.multiline_pattern = multiline_pattern
+        # 去重哈希使用的密钥，由文件路径派生，使相同内容在不同文件中得到不同的哈希
+        self.dedup_key = hashlib.blake2b(log_path.encode("utf-8"), digest_size=16).digest()
+        # 保持打开的文件描述符及其inode，文件被替换后重新打开
+        self._fd = None
+        self._fd_inode = None
+        # check_file_changed得到的(inode, 文件大小)，读取后失效
+        self._known_size = None
+        # 大日志文件的内容只读一次，读取后丢弃页缓存可以避免挤占其他程序的缓存
+        self.drop_page_cache = drop_page_cache and hasattr(os, "posix_fadvise")
         
-        # 如果有多行配置，则编译正则表达式
-        if self.multiline_config and self.multiline_config.get("type") == "pattern":
+        # 如果有多行配置且没有传入已编译的模式，则编译正则表达式
+        if self.multiline_pattern is None and self.multiline_config and self.multiline_config.get("type") == "pattern":
             pattern = self.multiline_config.get("pattern", "")
             if pattern:
                 try:
-                    self.multiline_pattern = re.compile(pattern)
-                    logger.debug(f"已编译多行匹配模式: {pattern}")
+                    self.multiline_pattern = re.compile(pattern.encode("utf-8"))
+                    logger.debug("已编译多行匹配模式: %s", pattern)
                 except re.error as e:
-                    logger.error(f"多行匹配模式编译失败: {pattern}, 错误: {e}")
+                    logger.error("多行匹配模式编译失败: %s, 错误: %s", pattern, e)
     
-    def get_file_inode(self) -> Optional[int]:
+    def _stat(self) -> Optional[os.stat_result]:
         """
-        获取文件的inode，用于检测文件是否被替换
+        获取日志文件的状态，一次stat同时得到inode和文件大小
         
         Returns:
-            文件的inode，如果文件不存在则返回None
+            文件状态，如果文件不存在或无法访问则返回None
         """
         try:
-            if os.path.exists(self.log_path):
-                return os.stat(self.log_path).st_ino
+            return os.stat(self.log_path)
+        except FileNotFoundError:
             return None
         except OSError as e:
-            logger.error(f"获取文件inode失败: {self.log_path}, 错误: {e}")
+            logger.error("获取文件状态失败: %s, 错误: %s", self.log_path, e)
             return None
     
+    def get_file_inode(self) -> Optional[int]:
+        """
+        获取文件的inode，用于检测文件是否被替换
+        
+        Returns:
+            文件的inode，如果文件不存在则返回None
+        """
+        stat_result = self._stat()
+        return stat_result.st_ino if stat_result is not None else None
+    
     def check_file_changed(self) -> bool:
         """
         检查文件是否发生变化（被替换或新建）
@@ -65,38 +372,41 @@ class LogReader:
         Returns:
             文件是否变化
         """
-        current_inode = self.get_file_inode()
+        stat_result = self._stat()
         
         # 文件不存在
-        if current_inode is None:
+        if stat_result is None:
             if self.file_exists:
-                logger.warning(f"日志文件不存在或无法访问: {self.log_path}")
+                logger.warning("日志文件不存在或无法访问: %s", self.log_path)
                 self.file_exists = False
+                # 释放已删除文件的描述符，避免占用磁盘空间
+                self.close()
             return False
         
+        current_inode = stat_result.st_ino
+        # 记录本次检查得到的文件大小，读取时无需再次获取
+        self._known_size = (current_inode, stat_result.st_size)
+        
         # 文件新建或被替换
         if self.last_inode != current_inode:
             self.last_inode = current_inode
             self.last_position = 0
             self.file_exists = True
-            logger.info(f"日志文件已变更或新建: {self.log_path}")
+            logger.info("日志文件已变更或新建: %s", self.log_path)
             return True
         
         # 文件大小变化
-        try:
-            current_size = os.path.getsize(self.log_path)
-            if current_size < self.last_position:
-                logger.info(f"日志文件被截断: {self.log_path}")
-                self.last_position = 0
-                return True
-            elif current_size > self.last_position:
-                return True
-        except OSError as e:
-            logger.error(f"获取文件大小失败: {self.log_path}, 错误: {e}")
+        current_size = stat_result.st_size
+        if current_size < self.last_position:
+            logger.info("日志文件被截断: %s", self.log_path)
+            self.last_position = 0
+            return True
+        elif current_size > self.last_position:
+            return True
         
         return False
     
-    def _process_multiline_logs(self, raw_lines: List[str]) -> List[str]:
+    def _process_multiline_logs(self, raw_lines: List[bytes]) -> List[bytes]:
         """
         处理多行日志，将属于同一条日志的多行合并
         
@@ -110,118 +420,457 @@ class LogReader:
             return raw_lines
         
         processed_lines = []
-        current_log = None
+        # 当前日志的各行，遇到下一条日志开始时再一次性拼接，避免逐行拼接产生的重复分配
+        current_parts = []
         
         for line in raw_lines:
             # 检查是否是新日志的开始
             if self.multiline_pattern.match(line):
                 # 如果有当前日志，则添加到结果中
-                if current_log is not None:
-                    processed_lines.append(current_log)
-                current_log = line
+                if current_parts:
+                    processed_lines.append(b"\n".join(current_parts))
+                current_parts = [line]
             else:
                 # 如果不是新日志的开始，则附加到当前日志
-                if current_log is not None:
-                    current_log += "\n" + line
-                else:
-                    # 如果没有当前日志（可能是文件的第一行不匹配模式），则创建一个新日志
-                    current_log = line
+                # 如果没有当前日志（可能是文件的第一行不匹配模式），则创建一个新日志
+                current_parts.append(line)
         
         # 添加最后一条日志
-        if current_log is not None:
-            processed_lines.append(current_log)
+        if current_parts:
+            processed_lines.append(b"\n".join(current_parts))
         
         return processed_lines
     
-    def read_new_lines(self) -> List[str]:
+    def _get_fd(self) -> int:
+        """
+        获取日志文件的文件描述符，文件未被替换时复用已打开的描述符
+        
+        Returns:
+            文件描述符
+        """
+        if self._fd is not None:
+            try:
+                fd_inode = os.fstat(self._fd).st_ino
+            except OSError:
+                fd_inode = None
+            if fd_inode is None or fd_inode != self._fd_inode:
+                # 描述符已失效或编号已被其他文件复用，不再属于本读取器，不能关闭
+                self._fd = None
+                self._fd_inode = None
+            elif fd_inode == self.last_inode:
+                return self._fd
+        
+        self.close()
+        fd = os.open(self.log_path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        self._fd = fd
+        self._fd_inode = os.fstat(fd).st_ino
+        
+        # 检查与打开之间文件被替换时，从新文件的开头读取
+        if self._fd_inode != self.last_inode:
+            self.last_inode = self._fd_inode
+            self.last_position = 0
+        return fd
+    
+    def close(self):
+        """关闭保持打开的文件描述符"""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+            self._fd_inode = None
+    
+    def __del__(self):
+        """读取器被回收时关闭文件描述符"""
+        self.close()
+    
+    def _split_multiline_records(self, data: bytes) -> Optional[List[bytes]]:
+        """
+        在整块缓冲区上一次扫描出所有日志起始位置，按起始位置切分出多行日志
+        
+        Args:
+            data: 由完整行组成的缓冲区（不含最后的换行符）
+            
+        Returns:
+            处理后的日志列表，起始模式无法整块扫描时返回None
+        """
+        scan_pattern = _compile_multiline_scan_pattern(self.multiline_pattern.pattern,
+                                                       self.multiline_pattern.flags)
+        if scan_pattern is None:
+            return None
+        
+        starts = [match.start() for match in scan_pattern.finditer(data)]
+        # 第一行不匹配起始模式时，开头的几行单独作为一条日志
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        
+        # 相邻起始位置之间即为一条日志，去掉下一条日志前的换行符
+        records = [data[start:end - 1] for start, end in zip(starts, starts[1:])]
+        records.append(data[starts[-1]:])
+        return records
+    
+    def read_new_lines(self) -> List[bytes]:
         """
         读取日志文件中的新行
         
+        日志以二进制方式读取，只有匹配到关键词的行才需要解码，省去对全部新内容的UTF-8解码。
+        
         Returns:
-            新增的日志行列表
+            新增的日志行列表（未解码的字节串）
         """
-        if not os.path.exists(self.log_path):
+        data = self.read_new_data()
+        if data is None:
             return []
         
+        # 如果有多行配置，则在整块数据上扫描日志起始位置
+        if self.multiline_pattern:
+            records = self._split_multiline_records(data)
+            if records is not None:
+                return records
+            return self._process_multiline_logs(data.split(b'\n'))
+        
+        # 按换行符切分，同时去除了行尾换行符
+        return data.split(b'\n')
+    
+    def read_new_data(self) -> Optional[bytes]:
+        """
+        读取日志文件中的新内容，不切分为行
+        
+        新内容通过一次pread读入，最后一行没有换行符时可能仍在写入，留到下次读取。
+        
+        Returns:
+            以换行符分隔的完整新行（不含最后的换行符），没有新的完整行时返回None
+        """
         try:
-            with open(self.log_path, 'r', encoding='utf-8', errors='replace') as file:
-                file.seek(0, os.SEEK_END)
-                end_position = file.tell()
-                
-                if end_position <= self.last_position:
-                    return []
-                
-                file.seek(self.last_position)
-                raw_lines = file.readlines()
-                self.last_position = end_position
-                
-                # 去除行尾换行符
-                raw_lines = [line.rstrip('\n') for line in raw_lines]
-                
-                # 如果有多行配置，则处理多行日志
-                if self.multiline_pattern:
-                    return self._process_multiline_logs(raw_lines)
-                
-                return raw_lines
+            fd = self._get_fd()
+            
+            # 优先使用检查变化时得到的文件大小，省去一次fstat
+            known_size = self._known_size
+            self._known_size = None
+            if known_size is not None and known_size[0] == self._fd_inode:
+                end_position = known_size[1]
+            else:
+                end_position = os.fstat(fd).st_size
+            
+            if end_position <= self.last_position:
+                return None
+            
+            buffer = os.pread(fd, end_position - self.last_position, self.last_position)
+            
+            # 只处理到最后一个换行符为止的完整行
+            last_newline = buffer.rfind(b'\n')
+            if last_newline < 0:
+                return None
+            
+            if self.drop_page_cache:
+                os.posix_fadvise(fd, self.last_position, last_newline + 1, os.POSIX_FADV_DONTNEED)
+            self.last_position += last_newline + 1
+            
+            return buffer[:last_newline]
+        except FileNotFoundError:
+            self.close()
+            return None
+        except OSError as e:
+            # 描述符出错时关闭，下次读取重新打开文件
+            logger.error("读取日志文件失败: %s, 错误: %s", self.log_path, e)
+            self.close()
+            return None
         except Exception as e:
-            logger.error(f"读取日志文件失败: {self.log_path}, 错误: {e}")
-            return []
+            logger.error("读取日志文件失败: %s, 错误: %s", self.log_path, e)
+            return None
 
 class KeywordMatcher:
     """关键词匹配器，用于在日志行中匹配关键词"""
     
+    # 关键词数量达到该值时才使用Aho-Corasick自动机，关键词较少时逐个in检查更快
+    AUTOMATON_MIN_KEYWORDS = 4
+    
     def __init__(self, keywords: List[str], use_regex: bool = False):
         """
-        初始化关键词匹配器
+        初始化关键词匹配器，字面量匹配直接在未解码的日志字节串上进行
         
         Args:
             keywords: 关键词列表
             use_regex: 是否使用正则表达式匹配
         """
         self.keywords = keywords
+        # 关键词按UTF-8编码为字节串，与未解码的日志行直接比较
+        self.keyword_bytes = [str(keyword).encode("utf-8") for keyword in keywords]
         self.use_regex = use_regex
         self.regex_patterns = []
+        self.combined_pattern = None
+        # 正则含有字面量以外的结构时，需要将日志行解码后用字符串正则匹配
+        self.decode_lines = False
+        self.automaton = None
+        # 正则的字面量预过滤：行中不含任何必需字面量时无需运行正则
+        self.prefilter_literals = None
+        self.prefilter_automaton = None
         
         if use_regex:
             self.compile_regex_patterns()
+        else:
+            self.build_automaton()
+    
+    def build_automaton(self):
+        """构建Aho-Corasick自动机，一次扫描即可匹配所有关键词"""
+        self.automaton = None
+        if ahocorasick is None or len(self.keywords) < self.AUTOMATON_MIN_KEYWORDS:
+            return
+        
+        # 空关键词或非字符串关键词保持原有的逐个匹配逻辑
+        if not all(isinstance(keyword, str) and keyword for keyword in self.keywords):
+            return
+        
+        self.automaton = _build_literal_automaton(self.keyword_bytes)
+        logger.debug("已构建关键词自动机，关键词数量: %d", len(self.keywords))
     
     def compile_regex_patterns(self):
-        """编译正则表达式模式"""
+        """
+        编译正则表达式模式
+        
+        字节串正则的\\d、\\w、\\b和忽略大小写只支持ASCII字符，因此只有全部正则都由普通字符
+        组成时才直接在字节串上匹配，否则将候选行解码后用字符串正则匹配。
+        
+        安装了google-re2时，合并后的正则优先使用RE2编译。RE2不支持反向引用和环视，
+        且\\d、\\w等只匹配ASCII字符，使用这些结构或无法用RE2编译的正则会回退到标准re模块。
+        """
         self.regex_patterns = []
+        self.combined_pattern = None
+        self.decode_lines = False
+        literals = []
         for keyword in self.keywords:
             try:
-                pattern = re.compile(keyword)
+                pattern = re.compile(str(keyword))
                 self.regex_patterns.append(pattern)
+                literals.append(_get_literal_pattern_bytes(pattern))
             except re.error as e:
-                logger.error(f"正则表达式编译失败: {keyword}, 错误: {e}")
+                logger.error("正则表达式编译失败: %s, 错误: %s", keyword, e)
+        
+        if all(literal is not None for literal in literals):
+            self.regex_patterns = [re.compile(re.escape(literal)) for literal in literals]
+        else:
+            self.decode_lines = True
+        
+        self.build_regex_prefilter()
+        
+        # 将所有有效的正则合并为一个分支表达式，每行只需搜索一次
+        # 合并后分组编号会变化，含有编号反向引用的正则不能合并
+        # 含内联全局标志等无法合并的情况，回退为逐个搜索
+        if not self.regex_patterns:
+            return
+        if self.decode_lines:
+            if any(re.search(r"\\[1-9]", pattern.pattern) for pattern in self.regex_patterns):
+                return
+            combined = "|".join(f"(?:{pattern.pattern})" for pattern in self.regex_patterns)
+        else:
+            combined = b"|".join(b"(?:" + pattern.pattern + b")" for pattern in self.regex_patterns)
+        
+        use_re2 = re2 is not None and not (
+            self.decode_lines and any(_uses_unicode_classes(pattern) for pattern in self.regex_patterns))
+        if use_re2:
+            try:
+                self.combined_pattern = re2.compile(combined)
+                logger.debug("已使用RE2编译关键词正则")
+                return
+            except Exception as e:
+                logger.debug("RE2不支持该正则，回退到re模块: %s", e)
+        
+        if len(self.regex_patterns) > 1:
+            try:
+                self.combined_pattern = re.compile(combined)
+            except re.error as e:
+                logger.debug("正则表达式无法合并，将逐个匹配: %s", e)
+    
+    def build_regex_prefilter(self):
+        """
+        从每个正则中提取必定出现的字面量作为预过滤条件
+        
+        只有所有正则都能提取出字面量时才启用，否则可能漏掉只匹配某个无字面量正则的行
+        """
+        self.prefilter_literals = None
+        self.prefilter_automaton = None
+        if not self.regex_patterns:
+            return
+        
+        literals = []
+        for pattern in self.regex_patterns:
+            literal = _extract_required_literal(pattern)
+            if literal is None:
+                return
+            if literal not in literals:
+                literals.append(literal)
+        
+        self.prefilter_literals = literals
+        if ahocorasick is not None and len(literals) >= self.AUTOMATON_MIN_KEYWORDS:
+            self.prefilter_automaton = _build_literal_automaton(literals)
+        logger.debug("已启用正则字面量预过滤: %s", literals)
+    
+    @staticmethod
+    def _contains_literal(line: bytes, literals: List[bytes], automaton) -> bool:
+        """
+        检查日志行是否包含任一字面量
+        
+        Args:
+            line: 未解码的日志行
+            literals: 字节串字面量列表
+            automaton: 由这些字面量构建的自动机，为None时逐个检查
+            
+        Returns:
+            是否包含
+        """
+        if automaton is not None:
+            for _ in automaton.iter(line.decode("latin-1")):
+                return True
+            return False
+        
+        for literal in literals:
+            if literal in line:
+                return True
+        return False
     
-    def match(self, line: str) -> bool:
+    def match(self, line: bytes) -> bool:
         """
         检查日志行是否匹配关键词
         
         Args:
-            line: 日志行
+            line: 未解码的日志行
             
         Returns:
             是否匹配
         """
         if self.use_regex:
+            # 不含任何必需字面量的行不可能匹配，跳过正则
+            if self.prefilter_literals is not None and not self._contains_literal(
+                    line, self.prefilter_literals, self.prefilter_automaton):
+                return False
+            
+            if self.decode_lines:
+                line = line.decode("utf-8", errors="replace")
+            
+            if self.combined_pattern is not None:
+                return self.combined_pattern.search(line) is not None
+            
             for pattern in self.regex_patterns:
                 if pattern.search(line):
                     return True
-        else:
-            for keyword in self.keywords:
-                if keyword in line:
-                    return True
+            return False
         
-        return False
+        return self._contains_literal(line, self.keyword_bytes, self.automaton)
+    
+    def get_scan_literals(self) -> Optional[List[bytes]]:
+        """
+        获取可以直接在整块日志数据上查找的字面量
+        
+        Returns:
+            匹配的行必定包含其中之一的字面量列表，无法确定时返回None
+        """
+        if self.use_regex:
+            return self.prefilter_literals
+        return self.keyword_bytes
     
-    def get_context(self, lines: List[str], matched_index: int, context_lines: int = 2) -> List[str]:
+    def find_candidate_lines(self, data: bytes, literals: List[bytes]) -> List[Tuple[int, int]]:
+        """
+        在整块日志数据上查找包含字面量的行，不为每一行创建字节串对象
+        
+        Args:
+            data: 以换行符分隔的日志数据
+            literals: 要查找的字面量列表
+            
+        Returns:
+            按位置排序的(行起始位置, 行结束位置)列表，结束位置为行尾换行符的位置
+        """
+        data_length = len(data)
+        automaton = self.prefilter_automaton if self.use_regex else self.automaton
+        if automaton is not None:
+            return self._find_candidate_lines_with_automaton(data, automaton)
+        
+        spans = set()
+        for literal in literals:
+            position = data.find(literal)
+            while position >= 0:
+                start = data.rfind(b'\n', 0, position) + 1
+                end = data.find(b'\n', position)
+                if end < 0:
+                    end = data_length
+                spans.add((start, end))
+                # 同一行只需记录一次，从下一行继续查找
+                position = data.find(literal, end + 1)
+        
+        return sorted(spans)
+    
+    @staticmethod
+    def _find_candidate_lines_with_automaton(data: bytes, automaton) -> List[Tuple[int, int]]:
+        """
+        用Aho-Corasick自动机一次扫描整块日志数据，查找包含字面量的行
+        
+        扫描在自动机的C实现中进行，每找到一个命中只需在Python中定位一次行边界，
+        然后从下一行开始继续扫描，同一行中的其余命中不会回到Python层。
+        
+        Args:
+            data: 以换行符分隔的日志数据
+            automaton: 由字面量构建的自动机，值为对应的字节串字面量
+            
+        Returns:
+            按位置排序的(行起始位置, 行结束位置)列表，结束位置为行尾换行符的位置
+        """
+        spans = []
+        data_length = len(data)
+        text = data.decode("latin-1")
+        position = 0
+        while position <= data_length:
+            # 自动机按命中结束位置的顺序返回，第一个命中所在的行就是下一个候选行
+            hit = next(automaton.iter(text, position), None)
+            if hit is None:
+                break
+            end_index, literal = hit
+            hit_start = end_index - len(literal) + 1
+            start = data.rfind(b'\n', 0, hit_start) + 1
+            end = data.find(b'\n', hit_start)
+            if end < 0:
+                end = data_length
+            spans.append((start, end))
+            position = end + 1
+        
+        return spans
+    
+    def get_context_window(self, data: bytes, start: int, end: int,
+                           context_lines: int = 2) -> Tuple[List[bytes], int]:
+        """
+        从整块日志数据中截取匹配行及其前后的上下文行
+        
+        Args:
+            data: 以换行符分隔的日志数据
+            start: 匹配行的起始位置
+            end: 匹配行的结束位置
+            context_lines: 上下文行数
+            
+        Returns:
+            (截取的日志行列表, 匹配行在其中的索引)
+        """
+        window_start = start
+        matched_index = 0
+        while matched_index < context_lines and window_start > 0:
+            window_start = data.rfind(b'\n', 0, window_start - 1) + 1
+            matched_index += 1
+        
+        window_end = end
+        data_length = len(data)
+        for _ in range(context_lines):
+            if window_end >= data_length:
+                break
+            window_end = data.find(b'\n', window_end + 1)
+            if window_end < 0:
+                window_end = data_length
+        
+        return data[window_start:window_end].split(b'\n'), matched_index
+    
+    def get_context(self, lines: List[bytes], matched_index: int, context_lines: int = 2) -> List[str]:
         """
         获取匹配行的上下文
         
         Args:
-            lines: 所有日志行
+            lines: 所有日志行（未解码的字节串）
             matched_index: 匹配行的索引
             context_lines: 上下文行数
             
@@ -234,24 +883,52 @@ class KeywordMatcher:
         context = []
         for i in range(start, end):
             prefix = ">> " if i == matched_index else "   "
-            context.append(f"{prefix}{lines[i]}")
+            context.append(prefix + lines[i].decode("utf-8", errors="replace"))
         
         return context
 
 class LogMonitor:
     """日志监控器，用于协调日志读取和关键词匹配"""
     
-    def __init__(self, log_configs: List[Dict[str, Any]]):
+    # 去重记录的最大数量
+    MAX_PROCESSED_HASHES = 10000
+    # 并发扫描日志文件的默认线程数
+    DEFAULT_SCAN_WORKERS = 8
+    
+    def __init__(self, log_configs: Sequence[LogFileSpec], max_workers: int = DEFAULT_SCAN_WORKERS):
         """
         初始化日志监控器
         
         Args:
             log_configs: 日志配置列表
+            max_workers: 并发扫描日志文件的最大线程数，为1时逐个扫描
         """
+        self.max_workers = max(1, max_workers)
+        # 扫描线程池，有多个文件需要扫描时才创建
+        self._executor = None
         self.log_readers = {}
         self.matchers = {}
+        # 相同关键词配置共享同一个匹配器，避免为每个文件重复构建自动机
+        self._matcher_cache = {}
+        # 多行匹配模式缓存: {模式字符串: 已编译的正则}，通配符展开的多个文件共享
+        self._multiline_pattern_cache = {}
+        # 通配符展开结果缓存: {通配符路径: (所在目录的修改时间, 展开后的路径列表)}
+        self._glob_cache = {}
         self.setup_monitors(log_configs)
-        self.processed_hashes = set()  # 用于去重
+        _live_monitors.add(self)
+        # 用于去重，按插入顺序保存最近的匹配哈希，超过上限时淘汰最早的记录
+        self.processed_hashes = OrderedDict()
+    
+    def _reset_after_fork(self):
+        """
+        在fork出的子进程中关闭所有读取器继承的文件描述符，下次读取时重新打开，并丢弃扫描线程池
+        
+        守护进程会关闭所有继承的描述符，描述符编号随后可能被复用，必须在此之前释放。
+        子进程中不存在父进程的扫描线程，继续使用原线程池提交的任务永远不会执行。
+        """
+        self._executor = None
+        for reader in self.log_readers.values():
+            reader.close()
     
     def _expand_path_patterns(self, path: str) -> List[str]:
         """
@@ -265,14 +942,73 @@ class LogMonitor:
         """
         # 检查路径中是否包含通配符
         if '*' in path or '?' in path or '[' in path:
+            # 通配符只在文件名中时，目录中增删文件会更新目录的修改时间，目录未变化则复用上次的展开结果
+            parent = os.path.dirname(path) or "."
+            parent_mtime = None
+            if not ('*' in parent or '?' in parent or '[' in parent):
+                try:
+                    parent_mtime = os.stat(parent).st_mtime_ns
+                except OSError:
+                    parent_mtime = None
+                
+                cached = self._glob_cache.get(path)
+                if cached is not None and parent_mtime is not None and cached[0] == parent_mtime:
+                    return cached[1]
+            
             expanded_paths = glob.glob(path)
+            if parent_mtime is not None:
+                self._glob_cache[path] = (parent_mtime, expanded_paths)
             if not expanded_paths:
-                logger.warning(f"通配符路径没有匹配到任何文件: {path}")
+                logger.warning("通配符路径没有匹配到任何文件: %s", path)
             return expanded_paths
         else:
             return [path]
     
-    def setup_monitors(self, log_configs: List[Dict[str, Any]]):
+    def _get_matcher(self, keywords: List[str], use_regex: bool) -> KeywordMatcher:
+        """
+        获取关键词匹配器，相同配置复用已构建的匹配器
+        
+        Args:
+            keywords: 关键词列表
+            use_regex: 是否使用正则表达式匹配
+            
+        Returns:
+            关键词匹配器
+        """
+        cache_key = (tuple(keywords), use_regex)
+        matcher = self._matcher_cache.get(cache_key)
+        if matcher is None:
+            matcher = KeywordMatcher(keywords, use_regex)
+            self._matcher_cache[cache_key] = matcher
+        return matcher
+    
+    def _get_multiline_pattern(self, multiline_config: Optional[Mapping[str, Any]]) -> Optional[Pattern]:
+        """
+        获取已编译的多行匹配模式，相同模式只编译一次
+        
+        Args:
+            multiline_config: 多行日志配置
+            
+        Returns:
+            已编译的正则，没有配置或编译失败时返回None
+        """
+        if not multiline_config or multiline_config.get("type") != "pattern":
+            return None
+        
+        pattern = multiline_config.get("pattern", "")
+        if not pattern:
+            return None
+        
+        if pattern not in self._multiline_pattern_cache:
+            try:
+                self._multiline_pattern_cache[pattern] = re.compile(pattern.encode("utf-8"))
+                logger.debug("已编译多行匹配模式: %s", pattern)
+            except re.error as e:
+                logger.error("多行匹配模式编译失败: %s, 错误: %s", pattern, e)
+                self._multiline_pattern_cache[pattern] = None
+        return self._multiline_pattern_cache[pattern]
+    
+    def setup_monitors(self, log_configs: Sequence[LogFileSpec]):
         """
         设置监控器
         
@@ -280,36 +1016,41 @@ class LogMonitor:
             log_configs: 日志配置列表
         """
         for config in log_configs:
-            log_path = config.get("path")
+            log_path = config.path
             if not log_path:
                 logger.warning("日志配置中缺少路径，跳过")
                 continue
             
-            keywords = config.get("keywords", [])
+            keywords = config.keywords
             if not keywords:
-                logger.warning(f"日志 {log_path} 没有配置关键词，跳过")
+                logger.warning("日志 %s 没有配置关键词，跳过", log_path)
                 continue
             
-            use_regex = config.get("use_regex", False)
+            use_regex = config.use_regex
             
             # 获取多行配置
-            multiline_config = config.get("multiline")
+            multiline_config = config.multiline
             
             # 展开通配符路径
             expanded_paths = self._expand_path_patterns(log_path)
             
             # 为每个匹配的路径创建日志读取器
+            matcher = self._get_matcher(keywords, use_regex)
+            multiline_pattern = self._get_multiline_pattern(multiline_config)
             for path in expanded_paths:
-                self.log_readers[path] = LogReader(path, multiline_config)
-                self.matchers[path] = KeywordMatcher(keywords, use_regex)
+                # 读取器统一以绝对路径为键，定期展开通配符和文件变更事件发现的同一文件不会重复监控
+                path = os.path.abspath(path)
+                self.log_readers[path] = LogReader(path, multiline_config, multiline_pattern,
+                                                   config.drop_page_cache)
+                self.matchers[path] = matcher
                 
-                logger.info(f"已设置日志监控: {path}, 关键词数量: {len(keywords)}, 使用正则: {use_regex}, 多行模式: {bool(multiline_config)}")
+                logger.info("已设置日志监控: %s, 关键词数量: %d, 使用正则: %s, 多行模式: %s", path, len(keywords), use_regex, bool(multiline_config))
             
             # 如果是通配符路径，记录展开结果
             if len(expanded_paths) > 1 or (expanded_paths and expanded_paths[0] != log_path):
-                logger.info(f"通配符路径 {log_path} 已展开为 {len(expanded_paths)} 个文件")
+                logger.info("通配符路径 %s 已展开为 %d 个文件", log_path, len(expanded_paths))
     
-    def check_for_new_files(self, log_configs: List[Dict[str, Any]]):
+    def check_for_new_files(self, log_configs: Sequence[LogFileSpec]):
         """
         检查通配符路径是否有新文件
         
@@ -317,7 +1058,7 @@ class LogMonitor:
             log_configs: 日志配置列表
         """
         for config in log_configs:
-            log_path = config.get("path")
+            log_path = config.path
             if not log_path or ('*' not in log_path and '?' not in log_path and '[' not in log_path):
                 continue
             
@@ -326,72 +1067,190 @@ class LogMonitor:
             
             # 检查是否有新文件
             for path in expanded_paths:
+                path = os.path.abspath(path)
                 if path not in self.log_readers:
-                    logger.info(f"发现新文件: {path}")
-                    
-                    # 获取多行配置
-                    multiline_config = config.get("multiline")
-                    keywords = config.get("keywords", [])
-                    use_regex = config.get("use_regex", False)
-                    
-                    # 创建日志读取器
-                    self.log_readers[path] = LogReader(path, multiline_config)
-                    self.matchers[path] = KeywordMatcher(keywords, use_regex)
-                    
-                    logger.info(f"已设置日志监控: {path}, 关键词数量: {len(keywords)}, 使用正则: {use_regex}, 多行模式: {bool(multiline_config)}")
+                    self._add_new_file(path, config)
     
-    def check_logs(self, log_configs: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    def _add_new_file(self, path: str, config: LogFileSpec):
         """
-        检查所有日志文件，查找匹配的日志行
+        为新发现的文件创建日志读取器
         
         Args:
-            log_configs: 可选的日志配置列表，用于检查新文件
+            path: 新文件的绝对路径
+            config: 该文件所属的日志配置
+        """
+        logger.info("发现新文件: %s", path)
+        
+        # 获取多行配置
+        multiline_config = config.multiline
+        keywords = config.keywords
+        use_regex = config.use_regex
+        
+        # 创建日志读取器
+        self.log_readers[path] = LogReader(path, multiline_config,
+                                           self._get_multiline_pattern(multiline_config),
+                                           config.drop_page_cache)
+        self.matchers[path] = self._get_matcher(keywords, use_regex)
+        
+        logger.info("已设置日志监控: %s, 关键词数量: %d, 使用正则: %s, 多行模式: %s", path, len(keywords), use_regex, bool(multiline_config))
+    
+    def check_changed_files_for_new(self, log_configs: Sequence[LogFileSpec], paths: Set[str]):
+        """
+        根据文件变更事件检查通配符路径的新文件，只匹配发生变化的路径，无需重新展开通配符
+        
+        Args:
+            log_configs: 日志配置列表
+            paths: 发生变化的文件路径集合
+        """
+        for path in paths:
+            abs_path = os.path.abspath(path)
+            name = os.path.basename(abs_path)
             
+            for config in log_configs:
+                log_path = config.path
+                if not log_path or ('*' not in log_path and '?' not in log_path and '[' not in log_path):
+                    continue
+                
+                pattern = os.path.abspath(log_path)
+                if not fnmatch.fnmatchcase(abs_path, pattern):
+                    continue
+                # 与glob保持一致：通配符不匹配以点开头的隐藏文件
+                if name.startswith('.') and not os.path.basename(pattern).startswith('.'):
+                    continue
+                
+                if abs_path not in self.log_readers and os.path.isfile(abs_path):
+                    self._add_new_file(abs_path, config)
+                break
+    
+    def check_logs(self, log_configs: Optional[Sequence[LogFileSpec]] = None,
+                   paths: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        检查日志文件，查找匹配的日志行
+        
+        Args:
+            log_configs: 可选的日志配置列表，用于检查新文件
+            paths: 可选的文件路径集合，指定时只检查这些发生变化的文件
+        
         Returns:
             匹配的日志信息列表
         """
-        # 如果提供了配置，检查是否有新文件
+        # 如果提供了配置，检查是否有新文件；由文件变更事件触发时只检查变化的路径
         if log_configs:
-            self.check_for_new_files(log_configs)
-            
+            if paths is not None:
+                self.check_changed_files_for_new(log_configs, paths)
+            else:
+                self.check_for_new_files(log_configs)
+        
         matches = []
+        append_match = matches.append
+        processed_hashes = self.processed_hashes
+        max_processed_hashes = self.MAX_PROCESSED_HASHES
+        blake2b = hashlib.blake2b
         
-        for log_path, reader in self.log_readers.items():
+        readers = self.log_readers.items()
+        if paths is not None:
+            changed_paths = {os.path.abspath(path) for path in paths}
+            readers = [(log_path, reader) for log_path, reader in readers
+                       if log_path in changed_paths]
+        
+        targets = []
+        for log_path, reader in readers:
             matcher = self.matchers.get(log_path)
-            if not matcher:
-                continue
-            
-            # 检查文件是否有变化
-            if reader.check_file_changed():
-                new_lines = reader.read_new_lines()
+            if matcher:
+                targets.append((log_path, reader, matcher))
+        
+        # 各文件的读取和匹配互不相关，读取和C实现的匹配会释放GIL，多个文件时并发扫描；
+        # 结果按文件顺序返回，去重和生成匹配记录仍在当前线程中进行
+        if len(targets) > 1 and self.max_workers > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="log-scan"
+                )
+            results = self._executor.map(self._scan_file, targets)
+        else:
+            results = [self._scan_file(target) for target in targets]
+        
+        for (log_path, reader, matcher), matched_lines in zip(targets, results):
+            for line, lines, index in matched_lines:
+                # 生成匹配记录的哈希，用于去重；BLAKE2b的结果在进程重启后保持不变
+                match_hash = blake2b(line, digest_size=8, key=reader.dedup_key).digest()
                 
-                if new_lines:
-                    logger.debug(f"读取到 {len(new_lines)} 行新日志: {log_path}")
+                # 去重检查
+                if match_hash not in processed_hashes:
+                    processed_hashes[match_hash] = None
+                    if len(processed_hashes) > max_processed_hashes:
+                        processed_hashes.popitem(last=False)
+                    
+                    # 只有匹配的行才需要解码；上下文推迟到格式化通知时才渲染，
+                    # 被通知管理器去重丢弃的匹配不再解码和拼接上下文行
+                    line_text = line.decode("utf-8", errors="replace")
+                    context = functools.partial(matcher.get_context, lines, index)
                     
-                    # 检查每一行是否匹配关键词
-                    for i, line in enumerate(new_lines):
-                        if matcher.match(line):
-                            # 获取上下文
-                            context = matcher.get_context(new_lines, i)
-                            
-                            # 生成匹配记录的哈希，用于去重
-                            match_hash = hash(f"{log_path}:{line}")
-                            
-                            # 去重检查
-                            if match_hash not in self.processed_hashes:
-                                self.processed_hashes.add(match_hash)
-                                
-                                matches.append({
-                                    "log_path": log_path,
-                                    "matched_line": line,
-                                    "context": context,
-                                    "timestamp": time.time()
-                                })
-                                
-                                logger.info(f"发现匹配: {log_path}: {line[:100]}...")
-        
-        # 限制哈希集合大小，避免内存泄漏
-        if len(self.processed_hashes) > 10000:
-            self.processed_hashes = set(list(self.processed_hashes)[-5000:])
-        
-        return matches 
\ No newline at end of file
+                    append_match({
+                        "log_path": log_path,
+                        "matched_line": line_text,
+                        "context": context,
+                        "timestamp": time.time()
+                    })
+                    
+                    logger.info("发现匹配: %s: %s...", log_path, line_text[:100])
+        
+        return matches
+    
+    def _scan_file(self, target: Tuple[str, LogReader, KeywordMatcher]) -> List[Tuple[bytes, List[bytes], int]]:
+        """
+        检查单个日志文件是否有变化，有变化时读取新内容并找出匹配的行
+        
+        Args:
+            target: (日志文件路径, 日志读取器, 关键词匹配器)
+            
+        Returns:
+            (匹配行, 用于获取上下文的日志行列表, 匹配行在其中的索引)列表
+        """
+        _, reader, matcher = target
+        if not reader.check_file_changed():
+            return []
+        return self._find_matched_lines(reader, matcher)
+    
+    def _find_matched_lines(self, reader: LogReader,
+                            matcher: KeywordMatcher) -> List[Tuple[bytes, List[bytes], int]]:
+        """
+        读取日志文件的新内容并找出匹配的行
+        
+        非多行日志且匹配器能给出字面量时，直接在整块数据上查找字面量，
+        只为候选行创建字节串对象；否则按行切分后逐行匹配。
+        
+        Args:
+            reader: 日志读取器
+            matcher: 关键词匹配器
+            
+        Returns:
+            (匹配行, 用于获取上下文的日志行列表, 匹配行在其中的索引)列表
+        """
+        matched = []
+        literals = matcher.get_scan_literals()
+        
+        if literals is not None and not reader.multiline_pattern:
+            data = reader.read_new_data()
+            if data is None:
+                return matched
+            
+            logger.debug("读取到 %d 字节新日志: %s", len(data), reader.log_path)
+            for start, end in matcher.find_candidate_lines(data, literals):
+                line = data[start:end]
+                if matcher.match(line):
+                    lines, index = matcher.get_context_window(data, start, end)
+                    matched.append((line, lines, index))
+            return matched
+        
+        new_lines = reader.read_new_lines()
+        if new_lines:
+            logger.debug("读取到 %d 行新日志: %s", len(new_lines), reader.log_path)
+        
+        # 检查每一行是否匹配关键词
+        for i, line in enumerate(new_lines):
+            if matcher.match(line):
+                matched.append((line, new_lines, i))
+        
+        return matched 
\ No newline at end of file
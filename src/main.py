@@ -12,32 +12,189 @@ import sys
 import argparse
 import logging
 from logging.handlers import TimedRotatingFileHandler
-import time
 import threading
 import signal
+import weakref
+from collections import deque
 from datetime import datetime
 
 from .application import Application
 
-class StandardizedLogFormatter(logging.Formatter):
-    """标准化日志格式化器，在格式化时添加文件名相关信息"""
+# 一次writev调用最多可以传入的缓冲区数量
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+# 信号编号到名称的映射，信号处理函数中直接查表
+_SIG_NAMES = {sig.value: sig.name for sig in signal.Signals}
+
+def create_standardized_formatter(module_name: str) -> logging.Formatter:
+    """
+    创建标准化日志格式化器，模块名称直接写入格式字符串
     
-    def __init__(self, fmt=None, datefmt=None, style='%', module_name="unspecified"):
-        super().__init__(fmt, datefmt, style)
-        self.module_name = module_name
+    模块名称是固定的，写入格式字符串后格式化时无需复制日志记录来添加模块名称属性。
+    
+    Args:
+        module_name: 模块/功能名称
+        
+    Returns:
+        日志格式化器
+    """
+    return logging.Formatter(
+        f"%(asctime)s - %(levelname)s - {module_name.replace('%', '%%')} - %(message)s"
+    )
+
+def _writev_all(fd: int, chunks: list):
+    """
+    用writev把多个字节串依次写入文件描述符，处理IOV_MAX限制和部分写入
+    
+    Args:
+        fd: 文件描述符
+        chunks: 要写入的字节串列表，部分写入时会被修改
+    """
+    index = 0
+    while index < len(chunks):
+        written = os.writev(fd, chunks[index:index + _IOV_MAX])
+        while written:
+            size = len(chunks[index])
+            if written >= size:
+                written -= size
+                index += 1
+            else:
+                chunks[index] = chunks[index][written:]
+                written = 0
+
+def _handle_without_lock(handler: logging.Handler, record) -> bool:
+    """
+    与logging.Handler.handle相同，但调用emit时不获取处理器锁
+    
+    Args:
+        handler: 日志处理器
+        record: 日志记录
+        
+    Returns:
+        日志记录是否通过过滤器
+    """
+    result = handler.filter(record)
+    # Python 3.12起过滤器可以返回替换后的日志记录
+    if isinstance(result, logging.LogRecord):
+        record = result
+    if result:
+        handler.emit(record)
+    return result
+
+# 当前进程中的文件处理器，fork后需要在子进程中重置它们的锁、缓冲区和写入线程
+_live_file_handlers = weakref.WeakSet()
+
+def _reset_file_handlers_after_fork():
+    """fork后在子进程中重置所有文件处理器，fork时写入线程可能正持有写入锁"""
+    for handler in list(_live_file_handlers):
+        handler._reset_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_file_handlers_after_fork)
+
+class _BufferFlusher:
+    """
+    后台写入线程，可由多个文件处理器共享
     
-    def format(self, record):
-        """重写format方法，为日志记录添加额外的信息"""
-        # 创建新的记录副本，避免修改原始记录
-        record_copy = logging.makeLogRecord(record.__dict__)
-        # 添加模块名称
-        record_copy.module_name = self.module_name
-        return super().format(record_copy)
+    有日志进入缓冲区时才被唤醒，稍等片刻后把这段时间内的日志一次写入文件，没有日志时不会定期唤醒。
+    """
+    
+    # 被唤醒后等待更多日志一起写入的时间（秒）
+    COALESCE_DELAY = 0.1
+    
+    def __init__(self, name: str):
+        """
+        初始化写入线程
+        
+        Args:
+            name: 线程名称
+        """
+        self.name = name
+        # 由本线程写入缓冲日志的文件处理器
+        self.handlers = []
+        self._lock = threading.Lock()
+        # 有日志等待写入时设置
+        self._pending = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def register(self, handler: "StandardizedFileHandler"):
+        """
+        登记由本线程写入缓冲日志的文件处理器
+        
+        Args:
+            handler: 文件处理器
+        """
+        self.handlers.append(handler)
+    
+    def is_running(self) -> bool:
+        """
+        检查写入线程是否在运行
+        
+        Returns:
+            写入线程是否在运行
+        """
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+    
+    def ensure_running(self):
+        """确保写入线程在运行，第一次写入日志时或fork后在子进程中创建"""
+        with self._lock:
+            if self.is_running() or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+    
+    def notify(self):
+        """通知写入线程有新的日志，已经通知过而写入线程尚未处理时无需重复通知"""
+        if not self._pending.is_set():
+            self._pending.set()
+    
+    def _run(self):
+        """写入线程主循环，等待新日志，稍等片刻后写入所有处理器的缓冲日志"""
+        pending = self._pending
+        stop = self._stop
+        while True:
+            pending.wait()
+            # 稍等片刻，把短时间内先后到达的日志合并为一次写入
+            stop.wait(self.COALESCE_DELAY)
+            # 先清除通知再取出缓冲区，之后加入的日志会重新设置通知
+            pending.clear()
+            for handler in list(self.handlers):
+                try:
+                    handler._write_buffer()
+                except Exception:
+                    # 写入失败时丢弃这批日志，不让写入线程退出
+                    pass
+            if stop.is_set():
+                break
+    
+    def stop(self):
+        """停止写入线程，停止前写入剩余的日志"""
+        self._stop.set()
+        self._pending.set()
+    
+    def reset_after_fork(self):
+        """在fork出的子进程中重新创建锁和事件，子进程中不存在父进程的写入线程"""
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
 
 class StandardizedFileHandler(TimedRotatingFileHandler):
-    """标准化文件处理器，动态生成符合标准的日志文件名"""
+    """
+    标准化文件处理器，动态生成符合标准的日志文件名
+    
+    日志记录先加入内存缓冲区，由后台线程在有日志时批量格式化并写入文件，WARNING及以上级别的日志立即写入。
+    """
     
-    def __init__(self, log_dir, module_name, level_name, when='midnight', interval=1, backupCount=10):
+    def __init__(self, log_dir, module_name, level_name, when='midnight', interval=1, backupCount=10,
+                 flusher: "_BufferFlusher" = None):
         """
         初始化处理器
         
@@ -48,6 +205,7 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
             when: 日志滚动时间单位
             interval: 滚动间隔
             backupCount: 保留文件数量
+            flusher: 共享的后台写入线程，为None时处理器使用自己的写入线程
         """
         self.log_dir = log_dir
         self.module_name = module_name
@@ -57,6 +215,19 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
         self.backupCount = backupCount
         self.file_created = False
         
+        # 每个记录日志的线程有自己的缓冲队列，追加日志时无需加锁，
+        # 队列元素为(日志记录, 格式化器, 已编码的字节串或None)，由写入线程从另一端取出
+        self._local = threading.local()
+        # 所有线程的(线程, 缓冲队列)，只在线程第一次记录日志和写入文件时加锁访问
+        self._thread_buffers = []
+        self._thread_buffers_lock = threading.Lock()
+        # 写入锁保证各批日志按顺序写入文件
+        self._write_lock = threading.Lock()
+        # 后台写入线程，多级别处理器的各级别文件共享同一个写入线程
+        self._owns_flusher = flusher is None
+        self._flusher = _BufferFlusher(f"log-flush-{level_name}") if flusher is None else flusher
+        self._flusher.register(self)
+        
         # 创建日志文件名前缀
         self.filename_prefix = f"{module_name}_{level_name}"
         self.current_filename = None
@@ -66,21 +237,40 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
         temp_file = os.devnull
         
         # 初始化父类，但禁用自动轮转 - 我们将使用自己的方式管理文件
+        # delay=True使父类不打开临时文件，实际的日志文件在第一次写入时才打开
         super().__init__(
             temp_file, 
             when=when, 
             interval=interval, 
-            backupCount=backupCount
+            backupCount=backupCount,
+            delay=True
         )
         # 禁用自动轮转
         self.rolloverAt = float('inf')  # 设置一个非常大的值，实际上禁用了自动轮转
         
         # 设置格式化器
-        formatter = StandardizedLogFormatter(
-            '%(asctime)s - %(levelname)s - %(module_name)s - %(message)s',
-            module_name=module_name
-        )
-        self.setFormatter(formatter)
+        self.setFormatter(create_standardized_formatter(module_name))
+        _live_file_handlers.add(self)
+    
+    def _reset_after_fork(self):
+        """
+        在fork出的子进程中重新创建锁、缓冲区和写入线程状态，并关闭继承的日志文件
+        
+        子进程中不存在父进程的线程，fork时被它们持有的锁永远不会释放；缓冲区中的日志由父进程写入。
+        守护进程会关闭所有继承的描述符，日志文件在此之前关闭，下次写入时重新以追加模式打开。
+        """
+        self._local = threading.local()
+        self._thread_buffers = []
+        self._thread_buffers_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher.reset_after_fork()
+        
+        if self.stream:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+            self.stream = None
     
     def _create_real_file(self):
         """当需要写入日志时，创建实际的日志文件"""
@@ -101,13 +291,154 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
             self.stream = self._open()
             self.file_created = True
     
-    def emit(self, record):
-        """重写emit方法，确保在写入日志前创建实际的日志文件"""
-        # 创建实际的日志文件（如果尚未创建）
-        self._create_real_file()
+    def _encode(self, message: str) -> bytes:
+        """按处理器的编码把一条日志文本编码为字节串"""
+        return (message + self.terminator).encode(self.encoding or "utf-8", self.errors or "strict")
+    
+    def _get_thread_buffer(self) -> deque:
+        """
+        获取当前线程的缓冲队列，第一次使用时创建并登记
+        
+        Returns:
+            当前线程的缓冲队列
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = deque()
+            self._local.buffer = buffer
+            with self._thread_buffers_lock:
+                self._thread_buffers.append((threading.current_thread(), buffer))
+        return buffer
+    
+    def _drain_thread_buffers(self) -> list:
+        """
+        取出所有线程缓冲队列中的日志，调用方需持有写入锁
+        
+        Returns:
+            按记录时间排序的日志列表
+        """
+        with self._thread_buffers_lock:
+            thread_buffers = list(self._thread_buffers)
+        
+        entries = []
+        has_dead_thread = False
+        for thread, buffer in thread_buffers:
+            # deque两端的append和popleft是原子操作，写入线程是唯一的取出方
+            while buffer:
+                entries.append(buffer.popleft())
+            if not thread.is_alive():
+                has_dead_thread = True
+        
+        # 已结束且缓冲已取空的线程不再需要登记
+        if has_dead_thread:
+            with self._thread_buffers_lock:
+                self._thread_buffers = [(thread, buffer) for thread, buffer in self._thread_buffers
+                                        if thread.is_alive() or buffer]
+        
+        # 多个线程的日志合并后按记录时间恢复先后顺序
+        if len(thread_buffers) > 1:
+            entries.sort(key=lambda entry: entry[0].created)
+        return entries
+    
+    def _write_buffer(self):
+        """
+        取出缓冲区中的日志，格式化并编码后一次写入文件
+        
+        格式化在记录日志的线程之外进行，不会阻塞它们；写入锁保证各批日志按顺序写入。
+        """
+        with self._write_lock:
+            entries = self._drain_thread_buffers()
+            if not entries:
+                return
+            
+            stream = self.stream
+            if not stream:
+                # fork后关闭了继承的日志文件，重新打开同一个文件继续写入
+                if not self.file_created:
+                    return
+                stream = self.stream = self._open()
+            
+            chunks = []
+            for record, formatter, data in entries:
+                if data is not None:
+                    chunks.append(data)
+                    continue
+                try:
+                    chunks.append(self._encode(formatter.format(record)))
+                except Exception:
+                    self.handleError(record)
+            
+            # 支持writev时把各条日志直接交给内核，省去拼接成一个大字节串的复制
+            if hasattr(os, "writev"):
+                _writev_all(stream.fileno(), chunks)
+            else:
+                stream.buffer.writelines(chunks)
+                stream.buffer.flush()
+    
+    def write_record(self, record, formatter: logging.Formatter = None):
+        """
+        将日志记录加入缓冲区，消息文本立即生成，其余格式化推迟到写入文件时进行
+        
+        Args:
+            record: 日志记录
+            formatter: 格式化器，为None时使用处理器自身的格式化器
+        """
+        if formatter is None:
+            formatter = self.formatter
+        
+        # 日志文件和写入线程都就绪后，记录日志的路径上不再加锁
+        flusher = self._flusher
+        if not self.file_created or not flusher.is_running():
+            self.acquire()
+            try:
+                # 创建实际的日志文件（如果尚未创建）
+                self._create_real_file()
+                flusher.ensure_running()
+            finally:
+                self.release()
+        
+        # 带异常信息的记录立即格式化，避免缓冲区长时间持有异常的调用栈
+        data = None
+        if record.exc_info:
+            data = self._encode(formatter.format(record))
+            # 格式化后的异常文本已缓存在exc_text中，其他处理器仍可输出，释放调用栈和其中的局部变量
+            record.exc_info = None
+        elif record.args:
+            # 与QueueHandler一样在记录日志时生成消息文本，调用方之后修改参数对象不会影响写入的内容，
+            # 缓冲区也不再持有参数对象；只推迟时间等其余部分的格式化
+            record.msg = record.getMessage()
+            record.args = None
+        
+        self._get_thread_buffer().append((record, formatter, data))
         
-        # 调用父类的emit方法写入日志
-        super().emit(record)
+        # 警告及以上级别的日志立即写入，避免进程崩溃时丢失
+        if record.levelno >= logging.WARNING:
+            self._write_buffer()
+        else:
+            # 先加入缓冲区再通知，写入线程清除通知后才取出缓冲区，不会遗漏日志
+            flusher.notify()
+    
+    def handle(self, record):
+        """处理日志记录，缓冲区本身是线程安全的，因此不持有处理器锁"""
+        return _handle_without_lock(self, record)
+    
+    def emit(self, record):
+        """重写emit方法，确保在写入日志前创建实际的日志文件，并将日志记录加入缓冲区"""
+        try:
+            self.write_record(record)
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        """写入缓冲区中的日志并刷新文件"""
+        self._write_buffer()
+        super().flush()
+    
+    def close(self):
+        """停止后台写入线程，写入剩余日志后关闭文件"""
+        if self._owns_flusher:
+            self._flusher.stop()
+        super().close()
     
     def doRollover(self):
         """重写轮转方法，使用自定义的命名方式"""
@@ -115,6 +446,7 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
         # 但为了安全起见，如果被调用，就创建一个新的文件
         if self.file_created:
             if self.stream:
+                self._write_buffer()
                 self.stream.close()
                 self.stream = None
             
@@ -122,6 +454,68 @@ class StandardizedFileHandler(TimedRotatingFileHandler):
             self.file_created = False
             self._create_real_file()
 
+class MultiLevelFileHandler(logging.Handler):
+    """多级别文件处理器，按级别把日志写入对应的日志文件，每条日志只格式化一次"""
+    
+    # 写入独立日志文件的级别，其他级别的日志不写入文件
+    LEVEL_NAMES = {
+        logging.INFO: "INFO",
+        logging.WARNING: "WARNING",
+        logging.ERROR: "ERROR",
+        logging.DEBUG: "DEBUG",
+    }
+    
+    def __init__(self, log_dir, module_name, when='midnight', interval=1, backupCount=10):
+        """
+        初始化处理器
+        
+        Args:
+            log_dir: 日志目录
+            module_name: 模块/功能名称
+            when: 日志滚动时间单位
+            interval: 滚动间隔
+            backupCount: 保留文件数量
+        """
+        super().__init__()
+        # 各级别的文件处理器共享一个后台写入线程
+        self._flusher = _BufferFlusher(f"log-flush-{module_name}")
+        # 各级别的文件处理器，负责文件命名、延迟创建和缓冲写入
+        self.level_handlers = {
+            level: StandardizedFileHandler(log_dir, module_name, level_name, when, interval, backupCount,
+                                           flusher=self._flusher)
+            for level, level_name in self.LEVEL_NAMES.items()
+        }
+        
+        # 设置格式化器
+        self.setFormatter(create_standardized_formatter(module_name))
+    
+    def handle(self, record):
+        """处理日志记录，各级别的文件处理器自行保证线程安全，因此不持有处理器锁"""
+        return _handle_without_lock(self, record)
+    
+    def emit(self, record):
+        """按日志级别选择文件处理器，由它在写入文件时用本处理器的格式化器格式化日志"""
+        handler = self.level_handlers.get(record.levelno)
+        if handler is None:
+            return
+        
+        try:
+            handler.write_record(record, self.formatter)
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        """刷新所有级别的日志文件"""
+        for handler in self.level_handlers.values():
+            handler.flush()
+    
+    def close(self):
+        """停止后台写入线程，关闭所有级别的日志文件"""
+        self._flusher.stop()
+        for handler in self.level_handlers.values():
+            handler.close()
+        super().close()
+
 # 设置日志
 def setup_logger(log_level=logging.INFO, module_name="tg_notification"):
     """
@@ -145,24 +539,8 @@ def setup_logger(log_level=logging.INFO, module_name="tg_notification"):
     log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
     os.makedirs(log_dir, exist_ok=True)
     
-    # 为不同级别创建不同的处理器
-    level_handlers = {
-        logging.INFO: StandardizedFileHandler(log_dir, module_name, "INFO"),
-        logging.WARNING: StandardizedFileHandler(log_dir, module_name, "WARNING"),
-        logging.ERROR: StandardizedFileHandler(log_dir, module_name, "ERROR"),
-        logging.DEBUG: StandardizedFileHandler(log_dir, module_name, "DEBUG"),
-    }
-    
-    # 配置各级别的处理器
-    for level, handler in level_handlers.items():
-        handler.setLevel(level)
-        
-        # 设置过滤器，只处理特定级别的日志
-        def filter_level(record, target_level=level):
-            return record.levelno == target_level
-            
-        handler.addFilter(filter_level)
-        logger.addHandler(handler)
+    # 一个处理器按级别把日志分别写入不同的文件
+    logger.addHandler(MultiLevelFileHandler(log_dir, module_name))
     
     # 控制台处理器（显示所有级别日志）
     console_handler = logging.StreamHandler()
@@ -222,14 +600,14 @@ def main():
     logger = setup_logger(log_level)
     
     logger.info("Telegram通知程序启动中...")
-    logger.debug(f"命令行参数: {args}")
+    logger.debug("命令行参数: %s", args)
     
     # 创建应用实例
     app = Application(args.config)
     
     # 根据命令执行相应的操作
     if args.command == "start":
-        logger.info(f"启动监控服务，间隔: {args.interval}秒，守护进程模式: {not args.no_daemon}")
+        logger.info("启动监控服务，间隔: %s秒，守护进程模式: %s", args.interval, not args.no_daemon)
         
         try:
             if app.start_service(args.interval, not args.no_daemon):
@@ -247,7 +625,7 @@ def main():
                         
                         # 注册信号处理函数
                         def signal_handler(signum, frame):
-                            logger.info(f"接收到信号: {signal.Signals(signum).name} ({signum})")
+                            logger.info("接收到信号: %s (%s)", _SIG_NAMES.get(signum, signum), signum)
                             print("接收到中断信号，正在停止服务...")
                             app.stop_service()
                             print("服务已停止")
@@ -257,23 +635,22 @@ def main():
                         original_sigint_handler = signal.getsignal(signal.SIGINT)
                         signal.signal(signal.SIGINT, signal_handler)
                         
-                        # 等待事件被设置
+                        # 等待事件被设置，信号处理函数设置事件后立即返回，无需定期唤醒检查
                         try:
-                            while not stop_event.is_set():
-                                stop_event.wait(1)  # 每秒检查一次
+                            stop_event.wait()
                         finally:
                             # 恢复原始信号处理函数
                             signal.signal(signal.SIGINT, original_sigint_handler)
                             
                     except Exception as e:
-                        logger.error(f"前台运行模式发生错误: {e}")
+                        logger.error("前台运行模式发生错误: %s", e)
                         app.stop_service()
                         print("服务已停止")
             else:
                 print("启动服务失败，请检查日志了解详情")
                 return 1
         except Exception as e:
-            logger.error(f"启动服务时发生未处理的异常: {e}")
+            logger.error("启动服务时发生未处理的异常: %s", e)
             print(f"启动服务失败: {e}")
             return 1
     
@@ -285,7 +662,7 @@ def main():
             print("停止服务失败，服务可能未在运行")
     
     elif args.command == "test":
-        logger.info(f"发送测试消息: {args.message}")
+        logger.info("发送测试消息: %s", args.message)
         if app.test_notification(args.message):
             print(f"测试消息发送成功: {args.message}")
         else:
@@ -314,7 +691,7 @@ def main():
                 
                 if scheduler.get("last_run_time"):
                     last_run = datetime.fromtimestamp(scheduler["last_run_time"])
-                    print(f"上次执行: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                    print(f"上次执行: {last_run:%Y-%m-%d %H:%M:%S}")
                     
                 if scheduler.get("next_run_in"):
                     print(f"下次执行: {int(scheduler['next_run_in'])}秒后")
@@ -7,35 +7,117 @@
 """
 
 import os
+import math
 import time
 import signal
 import logging
 import threading
 import sys
+import fnmatch
+import select
 import resource  # 添加resource模块导入
-from typing import Dict, List, Any, Optional, Callable
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from typing import Dict, List, Any, Optional, Callable, Set, Tuple
 from datetime import datetime
 
+try:
+    from watchfiles import watch
+except ImportError:  # 未安装watchfiles时回退到定时轮询
+    watch = None
+
 logger = logging.getLogger("tg_notification")
 
+# 信号编号到名称的映射，信号处理函数中直接查表
+_SIG_NAMES = {sig.value: sig.name for sig in signal.Signals}
+
+class _TaskStatusView(Mapping):
+    """单个任务状态的只读视图，读取时才从调度器的任务数组中取值"""
+    
+    __slots__ = ("_scheduler", "_task_id")
+    
+    KEYS = ("id", "name", "execution_count", "error_count", "last_execution_time", "last_execution_duration")
+    
+    def __init__(self, scheduler: "TaskScheduler", task_id: int):
+        """
+        初始化任务状态视图
+        
+        Args:
+            scheduler: 任务所属的调度器
+            task_id: 任务ID
+        """
+        self._scheduler = scheduler
+        self._task_id = task_id
+    
+    def __getitem__(self, key: str) -> Any:
+        scheduler = self._scheduler
+        task_id = self._task_id
+        if key == "id":
+            return task_id
+        if key == "name":
+            return scheduler.task_names[task_id]
+        if key == "execution_count":
+            return scheduler.task_execution_counts[task_id]
+        if key == "error_count":
+            return scheduler.task_error_counts[task_id]
+        if key == "last_execution_time":
+            last_time = scheduler.task_last_execution_times[task_id]
+            return None if math.isnan(last_time) else last_time
+        if key == "last_execution_duration":
+            last_duration = scheduler.task_last_execution_durations[task_id]
+            return None if last_duration < 0 else last_duration / 1e9
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(self.KEYS)
+    
+    def __len__(self) -> int:
+        return len(self.KEYS)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
 class TaskScheduler:
-    """任务调度器，用于定时执行任务"""
+    """
+    任务调度器，用于定时执行任务
     
-    def __init__(self, interval: int = 60):
+    注册了多个任务时，每轮在线程池中并行执行这些任务。应用本身只有一个监控任务，
+    使用的SingleTaskScheduler始终串行执行；并行执行供注册多个任务的调用方使用。
+    """
+    
+    def __init__(self, interval: int = 60, track_durations: bool = False):
         """
         初始化任务调度器
         
         Args:
             interval: 任务执行间隔（秒）
+            track_durations: 是否记录每个任务的上次执行时间和耗时
         """
         self.interval = interval
+        # 未开启时跳过任务计时，状态中的执行时间和耗时为None
+        self.track_durations = track_durations
         self.running = False
         self.stop_event = threading.Event()
-        self.tasks = []
+        # 任务表按字段分别保存在并列的数组中，下标即任务ID；计数和时间使用array紧凑存储
+        self.task_names = []
+        self.task_funcs = []
+        self.task_execution_counts = array('Q')
+        self.task_error_counts = array('Q')
+        # 上次执行的开始时间（时间戳），任务从未执行时为NaN
+        self.task_last_execution_times = array('d')
+        # 上次执行的耗时（纳秒，由单调时钟计算），任务从未执行时为-1
+        self.task_last_execution_durations = array('q')
         self.thread = None
         self.last_run_time = None
         self.execution_count = 0
         self.error_count = 0
+        # 是否输出调试日志，启动时刷新；关闭时循环中不再构造调试日志的参数
+        self._debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        # 并行执行多个任务的线程池，有多个任务时才创建
+        self._executor = None
+        # 每个任务在线程池中尚未汇总的执行结果，下标即任务ID；上一次仍在执行的任务不会重复提交
+        self._task_futures = []
     
     def add_task(self, task: Callable, name: str = None) -> int:
         """
@@ -48,71 +130,164 @@ class TaskScheduler:
         Returns:
             任务ID
         """
-        task_id = len(self.tasks)
+        task_id = len(self.task_names)
         task_name = name if name else f"Task-{task_id}"
         
-        self.tasks.append({
-            "id": task_id,
-            "name": task_name,
-            "func": task,
-            "execution_count": 0,
-            "error_count": 0,
-            "last_execution_time": None,
-            "last_execution_duration": None
-        })
-        
-        logger.info(f"添加任务: {task_name} (ID: {task_id})")
+        self.task_names.append(task_name)
+        self.task_funcs.append(task)
+        self.task_execution_counts.append(0)
+        self.task_error_counts.append(0)
+        self.task_last_execution_times.append(math.nan)
+        self.task_last_execution_durations.append(-1)
+        
+        logger.info("添加任务: %s (ID: %d)", task_name, task_id)
         return task_id
     
     def _run_tasks(self):
-        """运行所有任务"""
-        for task in self.tasks:
-            task_name = task["name"]
-            task_func = task["func"]
+        """运行所有任务，有多个任务时并行执行，慢任务不会拖延其他任务和下一轮调度"""
+        task_count = len(self.task_funcs)
+        if task_count <= 1:
+            results = [self._run_task(task_id) for task_id in range(task_count)]
+            succeeded = sum(results)
+            self.execution_count += succeeded
+            self.error_count += task_count - succeeded
+            return
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(32, task_count),
+                thread_name_prefix="tg-task"
+            )
+        futures = self._task_futures
+        if len(futures) < task_count:
+            futures.extend([None] * (task_count - len(futures)))
+        
+        submitted = []
+        for task_id in range(task_count):
+            future = futures[task_id]
+            if future is not None:
+                if not future.done():
+                    logger.warning("任务 %s 上一次执行尚未完成，本轮跳过", self.task_names[task_id])
+                    continue
+                self._collect_task_result(task_id)
+            futures[task_id] = self._executor.submit(self._run_task, task_id)
+            submitted.append(task_id)
+        
+        # 最多等待一个调度间隔，超时未完成的任务留到下一轮汇总
+        wait_futures([futures[task_id] for task_id in submitted], timeout=self.interval)
+        for task_id in submitted:
+            if futures[task_id].done():
+                self._collect_task_result(task_id)
+    
+    def _collect_task_result(self, task_id: int):
+        """
+        汇总线程池中已完成任务的执行结果，计数只在调度线程中修改，避免多个线程同时修改
+        
+        Args:
+            task_id: 任务ID
+        """
+        future = self._task_futures[task_id]
+        self._task_futures[task_id] = None
+        if future.result():
+            self.execution_count += 1
+        else:
+            self.error_count += 1
+    
+    def _run_task(self, task_id: int) -> bool:
+        """
+        运行单个任务并记录执行情况
+        
+        Args:
+            task_id: 任务ID
             
+        Returns:
+            任务是否执行成功
+        """
+        debug_enabled = self._debug_enabled
+        track_durations = self.track_durations
+        task_name = self.task_names[task_id]
+        if track_durations:
             start_time = time.time()
-            try:
-                logger.debug(f"开始执行任务: {task_name}")
-                task_func()
-                task["execution_count"] += 1
-                self.execution_count += 1
-                logger.debug(f"任务执行完成: {task_name}")
-            except Exception as e:
-                task["error_count"] += 1
-                self.error_count += 1
-                logger.error(f"任务执行失败: {task_name}, 错误: {e}")
-            finally:
-                end_time = time.time()
-                duration = end_time - start_time
-                task["last_execution_time"] = start_time
-                task["last_execution_duration"] = duration
-                logger.debug(f"任务 {task_name} 执行时间: {duration:.2f}秒")
+            start_ns = time.monotonic_ns()
+        
+        try:
+            if debug_enabled:
+                logger.debug("开始执行任务: %s", task_name)
+            self.task_funcs[task_id]()
+            self.task_execution_counts[task_id] += 1
+            if debug_enabled:
+                logger.debug("任务执行完成: %s", task_name)
+            succeeded = True
+        except Exception as e:
+            self.task_error_counts[task_id] += 1
+            logger.error("任务执行失败: %s, 错误: %s", task_name, e)
+            succeeded = False
+        
+        if track_durations:
+            duration_ns = time.monotonic_ns() - start_ns
+            self.task_last_execution_times[task_id] = start_time
+            self.task_last_execution_durations[task_id] = duration_ns
+            if debug_enabled:
+                logger.debug("任务 %s 执行时间: %.2f秒", task_name, duration_ns / 1e9)
+        
+        return succeeded
+    
+    def _wait_for_next_run(self, deadline_ns: int, interval_ns: int) -> Optional[int]:
+        """
+        按单调时钟上的绝对截止时间等待下一次执行，等待时间不受任务耗时误差影响，不会累积漂移
+        
+        Args:
+            deadline_ns: 下一次执行的计划时间（单调时钟纳秒）
+            interval_ns: 调度间隔（纳秒）
+            
+        Returns:
+            本次执行对应的计划时间，已错过截止时间时为最近一个错过的计划时间；调度器被停止时返回None
+        """
+        now_ns = time.monotonic_ns()
+        if now_ns < deadline_ns:
+            if self._debug_enabled:
+                logger.debug("等待下一次执行，等待时间: %.2f秒", (deadline_ns - now_ns) / 1e9)
+            # 等待可以被stop_event中断
+            if self.stop_event.wait((deadline_ns - now_ns) / 1e9):
+                return None
+            return deadline_ns
+        
+        if self.stop_event.is_set():
+            return None
+        
+        # 已错过截止时间时立即执行，之后仍按原有的节拍对齐
+        missed = (now_ns - deadline_ns) // interval_ns + 1
+        if missed > 1:
+            logger.warning("任务执行耗时过长，跳过了%d次调度", missed - 1)
+        return deadline_ns + (missed - 1) * interval_ns
     
     def _scheduler_loop(self):
         """调度器主循环"""
-        logger.info(f"任务调度器已启动，间隔: {self.interval}秒")
+        logger.info("任务调度器已启动，间隔: %s秒", self.interval)
+        
+        # 调度只使用单调时钟的整数纳秒，不受系统时间调整影响；last_run_time仅用于状态展示
+        interval_ns = int(self.interval * 1_000_000_000)
+        scheduled_ns = time.monotonic_ns()
         
         while not self.stop_event.is_set():
-            loop_start_time = time.time()
-            self.last_run_time = loop_start_time
+            loop_start_ns = time.monotonic_ns()
+            self.last_run_time = time.time()
             
             try:
                 # 执行所有任务
                 self._run_tasks()
             except Exception as e:
-                logger.error(f"任务执行循环发生错误: {e}")
-            
-            # 计算下一次运行的等待时间
-            elapsed = time.time() - loop_start_time
-            wait_time = max(0.1, self.interval - elapsed)
+                logger.error("任务执行循环发生错误: %s", e)
             
             # 如果任务执行时间超过了间隔，发出警告
-            if elapsed > self.interval:
-                logger.warning(f"任务执行时间 ({elapsed:.2f}秒) 超过了调度间隔 ({self.interval}秒)")
+            elapsed_ns = time.monotonic_ns() - loop_start_ns
+            if elapsed_ns > interval_ns:
+                logger.warning("任务执行时间 (%.2f秒) 超过了调度间隔 (%s秒)", elapsed_ns / 1e9, self.interval)
             
-            # 等待下一次执行，但可以被stop_event中断
-            logger.debug(f"等待下一次执行，等待时间: {wait_time:.2f}秒")
-            self.stop_event.wait(wait_time)
+            # 等待下一次执行，截止时间从上一次的计划时间推算而不是从任务结束时间推算
+            scheduled_ns = self._wait_for_next_run(scheduled_ns + interval_ns, interval_ns)
+            if scheduled_ns is None:
+                break
         
         logger.info("任务调度器已停止")
     
@@ -127,17 +302,18 @@ class TaskScheduler:
             logger.warning("任务调度器已经在运行")
             return False
         
-        if not self.tasks:
+        if not self.task_funcs:
             logger.warning("没有任务，调度器未启动")
             return False
         
         self.stop_event.clear()
         self.running = True
+        self._debug_enabled = logger.isEnabledFor(logging.DEBUG)
         self.thread = threading.Thread(target=self._scheduler_loop)
         self.thread.daemon = True
         self.thread.start()
         
-        logger.info(f"任务调度器已启动，{len(self.tasks)}个任务将每{self.interval}秒执行一次")
+        logger.info("任务调度器已启动，%d个任务将每%s秒执行一次", len(self.task_funcs), self.interval)
         return True
     
     def stop(self, timeout: int = 5) -> bool:
@@ -161,49 +337,357 @@ class TaskScheduler:
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout)
             if self.thread.is_alive():
-                logger.warning(f"任务调度器线程未在{timeout}秒内结束")
+                logger.warning("任务调度器线程未在%s秒内结束", timeout)
                 return False
         
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        
         logger.info("任务调度器已停止")
         return True
     
-    def get_status(self) -> Dict[str, Any]:
+    def get_status(self, verbose: bool = False) -> Dict[str, Any]:
         """
         获取调度器状态
         
+        Args:
+            verbose: 是否包含每个任务的执行情况
+        
         Returns:
             调度器状态字典
         """
         now = time.time()
         time_since_last_run = now - self.last_run_time if self.last_run_time else None
         
-        return {
+        status = {
             "running": self.running,
-            "tasks_count": len(self.tasks),
+            "tasks_count": len(self.task_funcs),
             "interval": self.interval,
             "execution_count": self.execution_count,
             "error_count": self.error_count,
             "last_run_time": self.last_run_time,
             "time_since_last_run": time_since_last_run,
-            "next_run_in": self.interval - time_since_last_run if time_since_last_run else None,
-            "tasks": [{
-                "id": task["id"],
-                "name": task["name"],
-                "execution_count": task["execution_count"],
-                "error_count": task["error_count"],
-                "last_execution_time": task["last_execution_time"],
-                "last_execution_duration": task["last_execution_duration"]
-            } for task in self.tasks]
+            "next_run_in": self.interval - time_since_last_run if time_since_last_run else None
+        }
+        
+        # 只有需要详细信息时才提供每个任务的状态，使用只读视图而不是逐个构建字典
+        if verbose:
+            status["tasks"] = [_TaskStatusView(self, task_id) for task_id in range(len(self.task_funcs))]
+        
+        return status
+
+class SingleTaskScheduler(TaskScheduler):
+    """单任务调度器，在专用线程中直接循环执行一个任务，省去通用调度器的任务遍历"""
+    
+    def __init__(self, task: Callable, interval: int = 60, name: str = None, track_durations: bool = False):
+        """
+        初始化单任务调度器
+        
+        Args:
+            task: 任务函数
+            interval: 任务执行间隔（秒）
+            name: 任务名称
+            track_durations: 是否记录任务的上次执行时间和耗时
+        """
+        super().__init__(interval, track_durations)
+        self.add_task(task, name)
+    
+    def _scheduler_loop(self):
+        """调度器主循环"""
+        logger.info("任务调度器已启动，间隔: %s秒", self.interval)
+        
+        task_func = self.task_funcs[0]
+        interval_ns = int(self.interval * 1_000_000_000)
+        track_durations = self.track_durations
+        scheduled_ns = time.monotonic_ns()
+        
+        while True:
+            start_time = time.time()
+            start_ns = time.monotonic_ns()
+            self.last_run_time = start_time
+            
+            try:
+                task_func()
+                self.task_execution_counts[0] += 1
+                self.execution_count += 1
+            except Exception as e:
+                self.task_error_counts[0] += 1
+                self.error_count += 1
+                logger.error("任务执行失败: %s, 错误: %s", self.task_names[0], e)
+            
+            elapsed_ns = time.monotonic_ns() - start_ns
+            if track_durations:
+                self.task_last_execution_times[0] = start_time
+                self.task_last_execution_durations[0] = elapsed_ns
+            
+            if elapsed_ns > interval_ns:
+                logger.warning("任务执行时间 (%.2f秒) 超过了调度间隔 (%s秒)", elapsed_ns / 1e9, self.interval)
+            
+            # 按计划时间等待下一次执行，stop_event被设置时立即退出
+            scheduled_ns = self._wait_for_next_run(scheduled_ns + interval_ns, interval_ns)
+            if scheduled_ns is None:
+                break
+        
+        logger.info("任务调度器已停止")
+
+class FileChangeWatcher:
+    """文件变更监听器，基于watchfiles（inotify/FSEvents）在日志文件变化时立即触发回调"""
+    
+    def __init__(self, paths_provider: Callable[[], List[str]],
+                 callback: Callable[[Set[str]], None],
+                 refresh_interval: int = 10):
+        """
+        初始化文件变更监听器
+        
+        Args:
+            paths_provider: 返回需要监听的日志路径列表（可包含通配符）的函数
+            callback: 文件发生变化时调用的函数，参数为变化文件的绝对路径集合
+            refresh_interval: 重新获取监听路径的间隔（秒），用于发现新增的日志文件和配置变更
+        """
+        self.paths_provider = paths_provider
+        self.callback = callback
+        self.refresh_interval = refresh_interval
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.event_count = 0
+        self.error_count = 0
+    
+    @staticmethod
+    def is_available() -> bool:
+        """
+        检查watchfiles是否可用
+        
+        Returns:
+            是否可以使用事件驱动的文件监听
+        """
+        return watch is not None
+    
+    @staticmethod
+    def _has_wildcard(path: str) -> bool:
+        """
+        检查路径中是否包含通配符
+        
+        Args:
+            path: 路径
+        
+        Returns:
+            是否包含通配符
+        """
+        return '*' in path or '?' in path or '[' in path
+    
+    def _build_targets(self) -> Tuple[Tuple[str, ...], bool, Tuple[str, ...]]:
+        """
+        根据日志路径计算需要监听的目录和用于过滤变更的路径模式
+        
+        监听的是日志文件所在的目录而不是文件本身，这样日志轮转（文件被替换或新建）
+        以及通配符路径下新出现的文件也能被捕获。目录部分含有通配符时（包括**），
+        递归监听最深的不含通配符的上级目录，再按路径模式过滤变更。
+        
+        Returns:
+            (监听目录元组, 是否递归监听, 绝对路径模式元组)
+        """
+        watch_dirs = set()
+        recursive_dirs = set()
+        patterns = set()
+        
+        for path in self.paths_provider():
+            if not path:
+                continue
+            pattern = os.path.abspath(path)
+            directory = os.path.dirname(pattern)
+            recursive = False
+            while self._has_wildcard(directory):
+                directory = os.path.dirname(directory)
+                recursive = True
+            
+            if os.path.isdir(directory):
+                (recursive_dirs if recursive else watch_dirs).add(directory)
+                patterns.add(pattern)
+            else:
+                logger.debug("日志目录不存在，暂不监听: %s", directory)
+        
+        if not recursive_dirs:
+            return tuple(sorted(watch_dirs)), False, tuple(sorted(patterns))
+        
+        # watchfiles对所有目录使用同一个递归设置，已被上级目录递归覆盖的目录无需单独监听
+        targets = []
+        for directory in sorted(watch_dirs | recursive_dirs):
+            if not any(directory == parent or directory.startswith(parent.rstrip(os.sep) + os.sep)
+                       for parent in targets):
+                targets.append(directory)
+        return tuple(targets), True, tuple(sorted(patterns))
+    
+    @staticmethod
+    def _match_pattern(path: str, pattern: str) -> bool:
+        """
+        按路径的每一级分别匹配通配符，与glob一致，*和**都不会跨越目录分隔符
+        
+        Args:
+            path: 变化文件的绝对路径
+            pattern: 绝对路径模式
+        
+        Returns:
+            是否匹配
+        """
+        if path == pattern:
+            return True
+        
+        path_parts = path.split(os.sep)
+        pattern_parts = pattern.split(os.sep)
+        if len(path_parts) != len(pattern_parts):
+            return False
+        return all(fnmatch.fnmatchcase(part, pattern_part)
+                   for part, pattern_part in zip(path_parts, pattern_parts))
+    
+    def _filter_changes(self, changes: Set[Tuple[Any, str]], patterns: Tuple[str, ...]) -> Set[str]:
+        """
+        过滤出属于监控日志的变更文件
+        
+        Args:
+            changes: watchfiles返回的变更集合
+            patterns: 绝对路径模式
+        
+        Returns:
+            变化的日志文件路径集合
+        """
+        changed_paths = set()
+        for _, changed_path in changes:
+            for pattern in patterns:
+                if self._match_pattern(changed_path, pattern):
+                    changed_paths.add(changed_path)
+                    break
+        return changed_paths
+    
+    def _watch_loop(self):
+        """监听主循环"""
+        logger.info("文件变更监听器已启动")
+        
+        while not self.stop_event.is_set():
+            targets = self._build_targets()
+            watch_dirs, recursive, patterns = targets
+            
+            if not watch_dirs:
+                # 没有可监听的目录，等待下一次刷新
+                self.stop_event.wait(self.refresh_interval)
+                continue
+            
+            if recursive:
+                logger.info("日志路径的目录部分含有通配符，递归监听目录: %s", list(watch_dirs))
+            else:
+                logger.debug("监听目录: %s", list(watch_dirs))
+            last_refresh = time.monotonic()
+            
+            try:
+                for changes in watch(
+                    *watch_dirs,
+                    watch_filter=None,
+                    debounce=100,
+                    stop_event=self.stop_event,
+                    rust_timeout=self.refresh_interval * 1000,
+                    yield_on_timeout=True,
+                    raise_interrupt=False,
+                    recursive=recursive
+                ):
+                    if changes:
+                        changed_paths = self._filter_changes(changes, patterns)
+                        if changed_paths:
+                            self.event_count += 1
+                            try:
+                                self.callback(changed_paths)
+                            except Exception as e:
+                                self.error_count += 1
+                                logger.error("处理文件变更失败: %s", e)
+                    
+                    # 定期刷新监听路径，配置变更或新目录出现时重新建立监听
+                    if time.monotonic() - last_refresh >= self.refresh_interval:
+                        last_refresh = time.monotonic()
+                        if targets != self._build_targets():
+                            logger.info("监听路径已变化，重新建立文件监听")
+                            break
+            except Exception as e:
+                self.error_count += 1
+                logger.error("文件变更监听发生错误: %s", e)
+                self.stop_event.wait(self.refresh_interval)
+        
+        logger.info("文件变更监听器已停止")
+    
+    def start(self) -> bool:
+        """
+        启动文件变更监听器
+        
+        Returns:
+            是否成功启动
+        """
+        if self.running:
+            logger.warning("文件变更监听器已经在运行")
+            return False
+        
+        if not self.is_available():
+            logger.warning("未安装watchfiles，无法启动文件变更监听器")
+            return False
+        
+        self.stop_event.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+    
+    def stop(self, timeout: int = 5) -> bool:
+        """
+        停止文件变更监听器
+        
+        Args:
+            timeout: 等待线程结束的超时时间（秒）
+        
+        Returns:
+            是否成功停止
+        """
+        if not self.running:
+            return False
+        
+        self.running = False
+        self.stop_event.set()
+        
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                logger.warning("文件变更监听器线程未在%s秒内结束", timeout)
+                return False
+        
+        return True
+    
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取监听器状态
+        
+        Returns:
+            监听器状态字典
+        """
+        return {
+            "running": self.running,
+            "event_count": self.event_count,
+            "error_count": self.error_count
         }
 
 class ServiceManager:
     """服务管理器，管理整个应用服务的生命周期"""
     
+    # 守护进程状态（PID文件和进程是否存在）的缓存时间（秒）
+    STATUS_CACHE_TTL = 1.0
+    
     def __init__(self):
         """初始化服务管理器"""
         self.scheduler = None
+        self.watcher = None
         self.running = False
         self.pid_file = "/tmp/tg_notification.pid"  # 设置默认PID文件路径
+        # (缓存时间, (PID文件是否存在, 进程ID, 守护进程是否在运行))
+        self._daemon_status_cache = (0.0, None)
+        # 服务停止时设置，守护进程的主循环等待它后退出
+        self.stop_event = threading.Event()
         
         # 注册信号处理
         signal.signal(signal.SIGINT, self._handle_signal)
@@ -217,8 +701,8 @@ class ServiceManager:
             signum: 信号编号
             frame: 当前栈帧
         """
-        sig_name = signal.Signals(signum).name
-        logger.info(f"接收到信号: {sig_name} ({signum})")
+        sig_name = _SIG_NAMES.get(signum, str(signum))
+        logger.info("接收到信号: %s (%s)", sig_name, signum)
         self.stop()
     
     def create_pid_file(self, pid_dir: str = "/tmp") -> bool:
@@ -237,11 +721,12 @@ class ServiceManager:
             
             with open(self.pid_file, 'w') as f:
                 f.write(str(pid))
+            self._daemon_status_cache = (0.0, None)
             
-            logger.info(f"创建PID文件: {self.pid_file} (PID: {pid})")
+            logger.info("创建PID文件: %s (PID: %d)", self.pid_file, pid)
             return True
         except Exception as e:
-            logger.error(f"创建PID文件失败: {e}")
+            logger.error("创建PID文件失败: %s", e)
             return False
     
     def remove_pid_file(self) -> bool:
@@ -256,10 +741,11 @@ class ServiceManager:
         
         try:
             os.remove(self.pid_file)
-            logger.info(f"已删除PID文件: {self.pid_file}")
+            self._daemon_status_cache = (0.0, None)
+            logger.info("已删除PID文件: %s", self.pid_file)
             return True
         except Exception as e:
-            logger.error(f"删除PID文件失败: {e}")
+            logger.error("删除PID文件失败: %s", e)
             return False
     
     def is_process_running(self, pid: int) -> bool:
@@ -280,9 +766,50 @@ class ServiceManager:
             # 进程不存在
             return False
         except Exception as e:
-            logger.error(f"检查进程状态时发生错误: {e}")
+            logger.error("检查进程状态时发生错误: %s", e)
             return False
     
+    def wait_for_process_exit(self, pid: int, timeout: float = 10) -> bool:
+        """
+        等待进程退出
+        
+        Args:
+            pid: 进程ID
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            进程是否已退出
+        """
+        # 优先使用pidfd（Linux 5.3+），进程退出时立即可读，无需轮询
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is not None:
+            try:
+                pidfd = pidfd_open(pid)
+            except ProcessLookupError:
+                return True
+            except OSError as e:
+                logger.debug("无法打开pidfd，改用轮询等待: %s", e)
+                pidfd = None
+            
+            if pidfd is not None:
+                try:
+                    ready, _, _ = select.select([pidfd], [], [], timeout)
+                    return bool(ready) or not self.is_process_running(pid)
+                finally:
+                    os.close(pidfd)
+        
+        # 回退方案：从短间隔开始逐步加长的轮询
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            if not self.is_process_running(pid):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+    
     def check_pid_file(self) -> Optional[int]:
         """
         检查PID文件是否存在并读取PID
@@ -290,24 +817,37 @@ class ServiceManager:
         Returns:
             进程ID，如果文件不存在或无效则返回None
         """
-        if not os.path.exists(self.pid_file):
-            return None
-            
+        return self._read_pid_file()[1]
+    
+    def _read_pid_file(self) -> Tuple[bool, Optional[int]]:
+        """
+        读取PID文件，直接打开文件而不是先检查文件是否存在
+        
+        Returns:
+            (PID文件是否存在, 进程ID)，文件不存在或内容无效时进程ID为None
+        """
         try:
             with open(self.pid_file, 'r') as f:
                 pid = int(f.read().strip())
-                return pid
+                return True, pid
+        except FileNotFoundError:
+            return False, None
         except (IOError, ValueError) as e:
-            logger.error(f"读取PID文件失败: {e}")
-            return None
+            logger.error("读取PID文件失败: %s", e)
+            return True, None
     
-    def start(self, scheduler: TaskScheduler, as_daemon: bool = True) -> bool:
+    def start(self, scheduler: TaskScheduler, as_daemon: bool = True,
+              watcher: Optional[FileChangeWatcher] = None,
+              before_fork: Optional[Callable[[], None]] = None) -> bool:
         """
         启动服务
         
         Args:
             scheduler: 任务调度器
             as_daemon: 是否以守护程序模式运行
+            watcher: 可选的文件变更监听器，与调度器一同启动和停止
+            before_fork: 可选的回调函数，守护进程模式下在fork之前调用，
+                例如发送完调度器首次执行产生的通知，父进程在fork后会直接退出
             
         Returns:
             是否成功启动
@@ -317,6 +857,8 @@ class ServiceManager:
             return False
         
         self.scheduler = scheduler
+        self.watcher = watcher
+        self.stop_event.clear()
         
         # 启动调度器 - 在daemon模式前先启动调度器验证配置
         if not self.scheduler.start():
@@ -328,9 +870,15 @@ class ServiceManager:
             # 先停止已启动的调度器，在子进程中再次启动
             self.scheduler.stop()
             
+            if before_fork is not None:
+                try:
+                    before_fork()
+                except Exception as e:
+                    logger.error("守护进程fork前的回调执行失败: %s", e)
+            
             # 保存当前工作目录
             original_dir = os.getcwd()
-            logger.debug(f"当前工作目录: {original_dir}")
+            logger.debug("当前工作目录: %s", original_dir)
             
             # 创建守护进程
             try:
@@ -338,12 +886,12 @@ class ServiceManager:
                 pid = os.fork()
                 if pid > 0:
                     # 父进程退出
-                    logger.info(f"已创建守护进程 (PID: {pid})")
+                    logger.info("已创建守护进程 (PID: %d)", pid)
                     # 等待子进程初始化
                     time.sleep(1)
                     sys.exit(0)
             except OSError as e:
-                logger.error(f"创建守护进程失败: {e}")
+                logger.error("创建守护进程失败: %s", e)
                 return False
             
             # 子进程继续运行
@@ -357,7 +905,7 @@ class ServiceManager:
                     # 第一个子进程退出
                     sys.exit(0)
             except OSError as e:
-                logger.error(f"守护进程二次fork失败: {e}")
+                logger.error("守护进程二次fork失败: %s", e)
                 sys.exit(1)
             
             # 第二个子进程继续运行（真正的守护进程）
@@ -365,7 +913,7 @@ class ServiceManager:
             try:
                 # 设置工作目录，使用原来的工作目录，不切换到根目录
                 os.chdir(original_dir)
-                logger.debug(f"守护进程工作目录: {os.getcwd()}")
+                logger.debug("守护进程工作目录: %s", os.getcwd())
                 
                 # 重设文件创建掩码
                 os.umask(0)
@@ -375,12 +923,9 @@ class ServiceManager:
                 if maxfd == resource.RLIM_INFINITY:
                     maxfd = 1024
                 
-                # 关闭所有继承的文件描述符
-                for fd in range(3, maxfd):
-                    try:
-                        os.close(fd)
-                    except OSError:
-                        pass
+                # 关闭所有继承的文件描述符，closerange在Linux上使用close_range系统调用一次完成，
+                # 不必对每个可能的描述符逐个调用close
+                os.closerange(3, maxfd)
                 
                 # 重定向标准输入/输出/错误到/dev/null
                 sys.stdout.flush()
@@ -398,39 +943,16 @@ class ServiceManager:
                 log_file = os.path.join(original_dir, "logs", "tg_notification.log")
                 try:
                     # 导入我们的标准化日志处理器而不是RotatingFileHandler
-                    from src.main import StandardizedFileHandler
+                    from .main import MultiLevelFileHandler
                     # 创建日志目录
                     log_dir = os.path.join(original_dir, "logs")
                     os.makedirs(log_dir, exist_ok=True)
                     
-                    # 为每个日志级别创建对应的处理器
-                    level_info = logging.INFO
-                    level_warning = logging.WARNING
-                    level_error = logging.ERROR
-                    level_debug = logging.DEBUG
-                    
-                    # 添加各级别的处理器
-                    handlers = [
-                        (StandardizedFileHandler(log_dir, "tg_notification", "INFO"), level_info),
-                        (StandardizedFileHandler(log_dir, "tg_notification", "WARNING"), level_warning),
-                        (StandardizedFileHandler(log_dir, "tg_notification", "ERROR"), level_error),
-                        (StandardizedFileHandler(log_dir, "tg_notification", "DEBUG"), level_debug)
-                    ]
-                    
-                    # 设置处理器并添加到logger
-                    for handler, level in handlers:
-                        handler.setLevel(level)
-                        
-                        # 设置过滤器，只处理特定级别的日志
-                        def make_filter(target_level):
-                            return lambda record: record.levelno == target_level
-                            
-                        handler.addFilter(make_filter(level))
-                        
-                        # 设置格式并添加处理器
-                        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                        handler.setFormatter(formatter)
-                        logger.addHandler(handler)
+                    # 一个处理器按级别把日志分别写入不同的文件
+                    handler = MultiLevelFileHandler(log_dir, "tg_notification")
+                    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+                    handler.setFormatter(formatter)
+                    logger.addHandler(handler)
                     
                     logger.debug("守护进程添加了标准化文件日志处理器")
                 except Exception as e:
@@ -445,23 +967,29 @@ class ServiceManager:
                     self.remove_pid_file()
                     sys.exit(1)
                 
+                # 文件监听线程同样需要在子进程中启动
+                if self.watcher:
+                    self.watcher.start()
+                
                 logger.info("守护进程已成功启动服务")
                 self.running = True
                 
-                # 注意：这里不应返回，而是在子进程中持续运行
-                # 子进程需要持续存在，防止退出
-                while True:
-                    # 每隔一段时间记录一条心跳日志，确保程序正在运行
-                    time.sleep(3600)  # 每小时记录一次
+                # 子进程持续运行，直到收到停止信号后由stop设置停止事件；
+                # 信号处理函数可以立即打断等待，每小时记录一条心跳日志，确保程序正在运行
+                while not self.stop_event.wait(3600):
                     logger.debug("守护进程心跳")
                 
+                # 返回后由调用方完成清理，守护进程随之正常退出
+                logger.info("守护进程主循环已退出")
+                return True
+                
             except Exception as e:
                 # 捕获并记录子进程中的任何异常
-                logger.critical(f"守护进程初始化时发生严重错误: {e}", exc_info=True)
+                logger.critical("守护进程初始化时发生严重错误: %s", e, exc_info=True)
                 try:
                     import traceback
                     error_details = traceback.format_exc()
-                    logger.critical(f"详细错误信息: {error_details}")
+                    logger.critical("详细错误信息: %s", error_details)
                     
                     # 也尝试写入系统日志
                     import syslog
@@ -476,6 +1004,9 @@ class ServiceManager:
                 sys.exit(1)
         
         # 非守护进程模式
+        if self.watcher:
+            self.watcher.start()
+        
         self.running = True
         logger.info("服务已启动（前台模式）")
         return True
@@ -491,6 +1022,10 @@ class ServiceManager:
             logger.warning("服务未运行")
             return False
         
+        # 停止文件监听器
+        if self.watcher:
+            self.watcher.stop()
+        
         # 停止调度器
         if self.scheduler:
             self.scheduler.stop()
@@ -499,35 +1034,58 @@ class ServiceManager:
         self.remove_pid_file()
         
         self.running = False
+        self.stop_event.set()
         logger.info("服务已停止")
         return True
     
-    def get_status(self) -> Dict[str, Any]:
+    def _get_daemon_status(self) -> Tuple[bool, Optional[int], bool]:
         """
-        获取服务状态
+        获取PID文件和守护进程的状态，短时间内重复查询时使用缓存的结果
         
         Returns:
-            服务状态字典
+            (PID文件是否存在, 进程ID, 守护进程是否在运行)
         """
-        # 检查PID文件中的进程是否在运行
-        pid = self.check_pid_file()
+        now = time.monotonic()
+        cached_at, cached = self._daemon_status_cache
+        if cached is not None and now - cached_at < self.STATUS_CACHE_TTL:
+            return cached
+        
+        # 检查PID文件中的进程是否在运行，读取PID文件的同时得到文件是否存在
+        pid_file_exists, pid = self._read_pid_file()
         is_daemon_running = False
         
         if pid:
             is_daemon_running = self.is_process_running(pid)
-            
+        
+        result = (pid_file_exists, pid, is_daemon_running)
+        self._daemon_status_cache = (now, result)
+        return result
+    
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取服务状态
+        
+        Returns:
+            服务状态字典
+        """
+        pid_file_exists, pid, is_daemon_running = self._get_daemon_status()
+        
         status = {
             "running": self.running or is_daemon_running,
             "pid": pid if is_daemon_running else os.getpid(),
             "pid_file": self.pid_file,
-            "pid_file_exists": os.path.exists(self.pid_file),
+            "pid_file_exists": pid_file_exists,
             "daemon_mode": is_daemon_running,
             "start_time": None,
             "uptime": None,
-            "scheduler": None
+            "scheduler": None,
+            "watcher": None
         }
         
         if self.scheduler:
             status["scheduler"] = self.scheduler.get_status()
         
+        if self.watcher:
+            status["watcher"] = self.watcher.get_status()
+        
         return status 
\ No newline at end of file
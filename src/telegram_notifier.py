@@ -10,13 +10,153 @@ import os
 import time
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import html
+import json
+import math
+import hashlib
 import re
-from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime
+import threading
+import weakref
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Callable
 
 logger = logging.getLogger("tg_notification")
 
+# Markdown特殊字符的转义表，format_text一次translate完成所有替换
+_MARKDOWN_ESCAPE_TABLE = str.maketrans({
+    char: f"\\{char}"
+    for char in ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+})
+
+# 各格式告警消息的固定部分:
+# (标题、时间和日志文件, 结构化的匹配内容, 原始的匹配内容, 上下文开头, 上下文结尾)
+_MESSAGE_TEMPLATES = {
+    "html": (
+        "<b>⚠️ 关键词告警</b>\n\n<b>时间:</b> {time}\n<b>日志文件:</b> <code>{path}</code>\n\n",
+        "<b>匹配内容:</b>\n{}\n\n",
+        "<b>匹配内容:</b>\n<pre>{}</pre>\n\n",
+        "<b>上下文:</b>\n<pre>",
+        "</pre>",
+    ),
+    "markdown": (
+        "*⚠️ 关键词告警*\n\n*时间:* {time}\n*日志文件:* `{path}`\n\n",
+        "*匹配内容:*\n{}\n\n",
+        "*匹配内容:*\n```\n{}\n```\n\n",
+        "*上下文:*\n```\n",
+        "```",
+    ),
+    "text": (
+        "⚠️ 关键词告警\n\n时间: {time}\n日志文件: {path}\n\n",
+        "匹配内容:\n{}\n\n",
+        "匹配内容:\n{}\n\n",
+        "上下文:\n",
+        "",
+    ),
+}
+
+# 带方括号字段的日志格式: (格式名称, 正则表达式, 依次对应各分组的字段名称)
+# 简单日志格式不使用正则表达式，由_parse_simple_log_line直接解析
+_LOG_FORMATS = (
+    # 标准日志格式：2025-03-28 10:15:23.456 [INFO] [main-thread] [TX123456] [PID9876] 消息内容
+    (
+        "standard",
+        r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d{3})?) \[([^\]]+)\] \[([^\]]+)\] \[([^\]]+)\] \[([^\]]+)\] (.+)$',
+        ("timestamp", "log_level", "thread", "transaction_id", "pid", "message")
+    ),
+    # 方括号日期格式：[2025-03-28 10:15:23] [system] [INFO] 消息内容
+    (
+        "bracketed",
+        r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] \[([^\]]+)\] \[([^\]]+)\] (.+)$',
+        ("timestamp", "component", "log_level", "message")
+    ),
+)
+
+def _compile_log_formats(log_formats) -> Tuple["re.Pattern[str]", Dict[str, Tuple[Tuple[str, int], ...]]]:
+    """
+    将所有日志格式合并为一个正则表达式，按顺序尝试各个分支，一次匹配即可确定格式并提取字段
+    
+    Args:
+        log_formats: (格式名称, 正则表达式, 字段名称) 序列
+        
+    Returns:
+        (合并后的正则表达式, {格式名称: ((字段名称, 分组序号), ...)})，格式名称即匹配结果的lastgroup
+    """
+    pattern = re.compile("|".join(f"(?P<{name}>{regex})" for name, regex, _ in log_formats))
+    format_fields = {}
+    group_index = 1
+    for name, _, fields in log_formats:
+        format_fields[name] = tuple(zip(fields, range(group_index + 1, group_index + 1 + len(fields))))
+        group_index += 1 + len(fields)
+    return pattern, format_fields
+
+# 正则表达式只在模块加载时编译一次，由所有格式化器共享
+_LOG_PATTERN, _LOG_FORMAT_FIELDS = _compile_log_formats(_LOG_FORMATS)
+
+def _escape_html(text: str) -> str:
+    """转义HTML特殊字符，文本只出现在标签内容中而不会出现在属性值中，无需转义引号"""
+    return html.escape(text, quote=False)
+
+def _escape_markdown(text: str) -> str:
+    """转义Markdown特殊字符"""
+    return text.translate(_MARKDOWN_ESCAPE_TABLE)
+
+def _parse_simple_log_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    解析简单日志格式：2023-07-01 10:15:38 ERROR 消息内容
+    
+    与正则表达式 ^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ([A-Z]+) (.+)$ 的匹配结果一致，
+    时间戳长度固定，按位置检查即可，不需要正则匹配
+    
+    Args:
+        line: 日志行
+        
+    Returns:
+        解析后的日志信息字典，不符合该格式时返回None
+    """
+    if len(line) < 23 or line[19] != " ":
+        return None
+    
+    timestamp = line[:19]
+    if not (timestamp[4] == timestamp[7] == "-" and timestamp[10] == " "
+            and timestamp[13] == timestamp[16] == ":"):
+        return None
+    digits = timestamp[:4] + timestamp[5:7] + timestamp[8:10] + timestamp[11:13] + timestamp[14:16] + timestamp[17:]
+    if not digits.isdecimal():
+        return None
+    
+    # 日志级别由大写字母组成，到下一个空格为止
+    level_end = line.find(" ", 20)
+    if level_end <= 20:
+        return None
+    log_level = line[20:level_end]
+    if not (log_level.isascii() and log_level.isalpha() and log_level.isupper()):
+        return None
+    
+    # 消息内容不能为空，除行尾的一个换行符外不能包含换行符
+    message = line[level_end + 1:]
+    if message.endswith("\n"):
+        message = message[:-1]
+    if not message or "\n" in message:
+        return None
+    
+    return {"timestamp": timestamp, "log_level": log_level, "message": message}
+
+def _message_key(match_info: Dict[str, Any]) -> bytes:
+    """
+    计算用于去重的消息键
+    
+    Args:
+        match_info: 匹配信息字典
+        
+    Returns:
+        日志路径和匹配行的16字节blake2b摘要
+    """
+    key_text = f"{match_info.get('log_path')}\0{match_info.get('matched_line')}"
+    return hashlib.blake2b(key_text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
 class MessageFormatter:
     """消息格式化器，用于将日志消息格式化为Telegram消息"""
     
@@ -25,47 +165,31 @@ class MessageFormatter:
         初始化消息格式化器
         
         Args:
-            format_type: 消息格式类型，支持"html"和"markdown"
+            format_type: 消息格式类型，支持"html"、"markdown"和纯文本"text"
         """
         self.format_type = format_type.lower()
-        if self.format_type not in ["html", "markdown"]:
-            logger.warning(f"不支持的消息格式类型: {format_type}，使用默认类型: html")
+        if self.format_type not in ["html", "markdown", "text"]:
+            logger.warning("不支持的消息格式类型: %s，使用默认类型: html", format_type)
             self.format_type = "html"
         
-        # 常见日志格式的正则表达式模式
-        self.log_patterns = [
-            # 标准日志格式：2025-03-28 10:15:23.456 [INFO] [main-thread] [TX123456] [PID9876] 消息内容
-            (
-                re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d{3})?) \[([^\]]+)\] \[([^\]]+)\] \[([^\]]+)\] \[([^\]]+)\] (.+)$'),
-                lambda m: {
-                    "timestamp": m.group(1),
-                    "log_level": m.group(2),
-                    "thread": m.group(3),
-                    "transaction_id": m.group(4),
-                    "pid": m.group(5),
-                    "message": m.group(6)
-                }
-            ),
-            # 方括号日期格式：[2025-03-28 10:15:23] [system] [INFO] 消息内容
-            (
-                re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] \[([^\]]+)\] \[([^\]]+)\] (.+)$'),
-                lambda m: {
-                    "timestamp": m.group(1),
-                    "component": m.group(2),
-                    "log_level": m.group(3),
-                    "message": m.group(4)
-                }
-            ),
-            # 简单日志格式：2023-07-01 10:15:38 ERROR 消息内容
-            (
-                re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ([A-Z]+) (.+)$'),
-                lambda m: {
-                    "timestamp": m.group(1),
-                    "log_level": m.group(2),
-                    "message": m.group(3)
-                }
-            )
-        ]
+        # 告警消息中与内容无关的固定部分，格式化时只需填入内容
+        (self._message_header, self._structured_match_template, self._raw_match_template,
+         self._context_open, self._context_close) = _MESSAGE_TEMPLATES[self.format_type]
+        
+        # 格式类型在初始化后不再变化，按格式类型选定转义函数和结构化消息的格式化方法，格式化时不再逐次判断
+        if self.format_type == "html":
+            self._escape = _escape_html
+            self._format_structured_message = self._format_structured_html
+        elif self.format_type == "markdown":
+            self._escape = _escape_markdown
+            self._format_structured_message = self._format_structured_markdown
+        else:
+            # 纯文本格式不需要转义，用于Telegram无法解析标记时重发
+            self._escape = str
+            self._format_structured_message = self._format_structured_text
+        
+        # 最近一次格式化的时间戳（整秒）及其文本，同一秒内的多条告警直接复用
+        self._time_cache = (None, "")
     
     def format_text(self, text: str) -> str:
         """
@@ -77,15 +201,7 @@ class MessageFormatter:
         Returns:
             格式化后的文本
         """
-        if self.format_type == "html":
-            return html.escape(text)
-        elif self.format_type == "markdown":
-            # 处理Markdown特殊字符
-            special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-            for char in special_chars:
-                text = text.replace(char, f"\\{char}")
-            return text
-        return text
+        return self._escape(text)
     
     def _parse_log_line(self, line: str) -> Dict[str, Any]:
         """
@@ -97,17 +213,37 @@ class MessageFormatter:
         Returns:
             解析后的日志信息字典
         """
-        for pattern, extractor in self.log_patterns:
-            match = pattern.match(line)
+        # 所有格式都以数字或方括号开头，其他行不需要进行匹配
+        first_char = line[:1]
+        if first_char.isdigit() or first_char == "[":
+            # 最常见的简单日志格式直接按位置解析
+            parsed_log = _parse_simple_log_line(line)
+            if parsed_log is not None:
+                return parsed_log
+            
+            match = _LOG_PATTERN.match(line)
             if match:
-                return extractor(match)
+                return {field: match.group(index) for field, index in _LOG_FORMAT_FIELDS[match.lastgroup]}
         
         # 如果没有匹配任何模式，则返回原始消息
         return {"raw_message": line}
     
-    def _get_log_level_emoji(self, log_level: str) -> str:
+    # 常见日志级别对应的emoji
+    LEVEL_EMOJIS = {
+        "ERROR": "🔴",
+        "EXCEPTION": "🔴",
+        "FATAL": "🔴",
+        "WARN": "⚠️",
+        "WARNING": "⚠️",
+        "INFO": "ℹ️",
+        "DEBUG": "🔍",
+    }
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _get_log_level_emoji(log_level: str) -> str:
         """
-        根据日志级别返回对应的emoji
+        根据日志级别返回对应的emoji，日志级别的取值很少，结果按级别缓存
         
         Args:
             log_level: 日志级别
@@ -117,6 +253,11 @@ class MessageFormatter:
         """
         level = log_level.upper() if log_level else ""
         
+        emoji = MessageFormatter.LEVEL_EMOJIS.get(level)
+        if emoji is not None:
+            return emoji
+        
+        # 其他写法的级别（如"[ERROR]"、"DEBUG2"）按包含的关键字判断
         if "ERROR" in level or "EXCEPTION" in level or "FATAL" in level:
             return "🔴"
         elif "WARN" in level:
@@ -128,9 +269,9 @@ class MessageFormatter:
         else:
             return "📄"
     
-    def _format_structured_message(self, parsed_log: Dict[str, Any]) -> str:
+    def _format_structured_html(self, parsed_log: Dict[str, Any]) -> str:
         """
-        格式化结构化日志信息
+        将结构化日志信息格式化为HTML消息
         
         Args:
             parsed_log: 解析后的日志信息
@@ -138,92 +279,135 @@ class MessageFormatter:
         Returns:
             格式化后的消息
         """
-        # 如果是原始消息，直接返回
-        if "raw_message" in parsed_log:
-            return parsed_log["raw_message"]
-        
         # 获取日志级别和emoji
         log_level = parsed_log.get("log_level", "")
         emoji = self._get_log_level_emoji(log_level)
+        format_text = self._escape
         
-        # 构建结构化消息
-        if self.format_type == "html":
-            message = f"{emoji} <b>{self.format_text(log_level)}</b>\n\n"
-            
-            # 添加时间戳
-            if "timestamp" in parsed_log:
-                message += f"<b>时间:</b> {self.format_text(parsed_log['timestamp'])}\n"
-            
-            # 添加组件/线程信息
-            if "component" in parsed_log:
-                message += f"<b>组件:</b> {self.format_text(parsed_log['component'])}\n"
-            elif "thread" in parsed_log:
-                message += f"<b>线程:</b> {self.format_text(parsed_log['thread'])}\n"
-            
-            # 添加事务ID
-            if "transaction_id" in parsed_log:
-                message += f"<b>事务ID:</b> {self.format_text(parsed_log['transaction_id'])}\n"
-            
-            # 添加PID
-            if "pid" in parsed_log:
-                message += f"<b>PID:</b> {self.format_text(parsed_log['pid'])}\n"
-            
-            # 添加消息内容
-            if "message" in parsed_log:
-                message += f"\n<b>消息:</b>\n<pre>{self.format_text(parsed_log['message'])}</pre>"
-            
-        elif self.format_type == "markdown":
-            message = f"{emoji} *{self.format_text(log_level)}*\n\n"
-            
-            # 添加时间戳
-            if "timestamp" in parsed_log:
-                message += f"*时间:* {self.format_text(parsed_log['timestamp'])}\n"
-            
-            # 添加组件/线程信息
-            if "component" in parsed_log:
-                message += f"*组件:* {self.format_text(parsed_log['component'])}\n"
-            elif "thread" in parsed_log:
-                message += f"*线程:* {self.format_text(parsed_log['thread'])}\n"
-            
-            # 添加事务ID
-            if "transaction_id" in parsed_log:
-                message += f"*事务ID:* {self.format_text(parsed_log['transaction_id'])}\n"
-            
-            # 添加PID
-            if "pid" in parsed_log:
-                message += f"*PID:* {self.format_text(parsed_log['pid'])}\n"
-            
-            # 添加消息内容
-            if "message" in parsed_log:
-                message += f"\n*消息:*\n```\n{self.format_text(parsed_log['message'])}\n```"
+        parts = [f"{emoji} <b>{format_text(log_level)}</b>\n\n"]
         
-        else:
-            # 纯文本格式
-            message = f"{emoji} {log_level}\n\n"
-            
-            # 添加时间戳
-            if "timestamp" in parsed_log:
-                message += f"时间: {parsed_log['timestamp']}\n"
-            
-            # 添加组件/线程信息
-            if "component" in parsed_log:
-                message += f"组件: {parsed_log['component']}\n"
-            elif "thread" in parsed_log:
-                message += f"线程: {parsed_log['thread']}\n"
-            
-            # 添加事务ID
-            if "transaction_id" in parsed_log:
-                message += f"事务ID: {parsed_log['transaction_id']}\n"
+        # 添加时间戳
+        if "timestamp" in parsed_log:
+            parts.append(f"<b>时间:</b> {format_text(parsed_log['timestamp'])}\n")
+        
+        # 添加组件/线程信息
+        if "component" in parsed_log:
+            parts.append(f"<b>组件:</b> {format_text(parsed_log['component'])}\n")
+        elif "thread" in parsed_log:
+            parts.append(f"<b>线程:</b> {format_text(parsed_log['thread'])}\n")
+        
+        # 添加事务ID
+        if "transaction_id" in parsed_log:
+            parts.append(f"<b>事务ID:</b> {format_text(parsed_log['transaction_id'])}\n")
+        
+        # 添加PID
+        if "pid" in parsed_log:
+            parts.append(f"<b>PID:</b> {format_text(parsed_log['pid'])}\n")
+        
+        # 添加消息内容
+        if "message" in parsed_log:
+            parts.append(f"\n<b>消息:</b>\n<pre>{format_text(parsed_log['message'])}</pre>")
+        
+        return "".join(parts)
+    
+    def _format_structured_markdown(self, parsed_log: Dict[str, Any]) -> str:
+        """
+        将结构化日志信息格式化为Markdown消息
+        
+        Args:
+            parsed_log: 解析后的日志信息
             
-            # 添加PID
-            if "pid" in parsed_log:
-                message += f"PID: {parsed_log['pid']}\n"
+        Returns:
+            格式化后的消息
+        """
+        # 获取日志级别和emoji
+        log_level = parsed_log.get("log_level", "")
+        emoji = self._get_log_level_emoji(log_level)
+        format_text = self._escape
+        
+        parts = [f"{emoji} *{format_text(log_level)}*\n\n"]
+        
+        # 添加时间戳
+        if "timestamp" in parsed_log:
+            parts.append(f"*时间:* {format_text(parsed_log['timestamp'])}\n")
+        
+        # 添加组件/线程信息
+        if "component" in parsed_log:
+            parts.append(f"*组件:* {format_text(parsed_log['component'])}\n")
+        elif "thread" in parsed_log:
+            parts.append(f"*线程:* {format_text(parsed_log['thread'])}\n")
+        
+        # 添加事务ID
+        if "transaction_id" in parsed_log:
+            parts.append(f"*事务ID:* {format_text(parsed_log['transaction_id'])}\n")
+        
+        # 添加PID
+        if "pid" in parsed_log:
+            parts.append(f"*PID:* {format_text(parsed_log['pid'])}\n")
+        
+        # 添加消息内容
+        if "message" in parsed_log:
+            parts.append(f"\n*消息:*\n```\n{format_text(parsed_log['message'])}\n```")
+        
+        return "".join(parts)
+    
+    def _format_structured_text(self, parsed_log: Dict[str, Any]) -> str:
+        """
+        将结构化日志信息格式化为纯文本消息
+        
+        Args:
+            parsed_log: 解析后的日志信息
             
-            # 添加消息内容
-            if "message" in parsed_log:
-                message += f"\n消息:\n{parsed_log['message']}"
+        Returns:
+            格式化后的消息
+        """
+        # 获取日志级别和emoji
+        log_level = parsed_log.get("log_level", "")
+        emoji = self._get_log_level_emoji(log_level)
+        
+        parts = [f"{emoji} {log_level}\n\n"]
+        
+        # 添加时间戳
+        if "timestamp" in parsed_log:
+            parts.append(f"时间: {parsed_log['timestamp']}\n")
+        
+        # 添加组件/线程信息
+        if "component" in parsed_log:
+            parts.append(f"组件: {parsed_log['component']}\n")
+        elif "thread" in parsed_log:
+            parts.append(f"线程: {parsed_log['thread']}\n")
+        
+        # 添加事务ID
+        if "transaction_id" in parsed_log:
+            parts.append(f"事务ID: {parsed_log['transaction_id']}\n")
         
-        return message
+        # 添加PID
+        if "pid" in parsed_log:
+            parts.append(f"PID: {parsed_log['pid']}\n")
+        
+        # 添加消息内容
+        if "message" in parsed_log:
+            parts.append(f"\n消息:\n{parsed_log['message']}")
+        
+        return "".join(parts)
+    
+    def _format_timestamp(self, timestamp: float) -> str:
+        """
+        将时间戳格式化为可读的本地时间，同一秒内重复调用时使用缓存的结果
+        
+        Args:
+            timestamp: 时间戳
+            
+        Returns:
+            格式为"%Y-%m-%d %H:%M:%S"的时间文本
+        """
+        second = int(timestamp)
+        cached_second, cached_text = self._time_cache
+        if second != cached_second:
+            cached_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            # 以元组整体替换，多个发送线程同时格式化时不会读到不一致的缓存
+            self._time_cache = (second, cached_text)
+        return cached_text
     
     def format_message(self, match_info: Dict[str, Any]) -> str:
         """
@@ -238,72 +422,42 @@ class MessageFormatter:
         log_path = match_info.get("log_path", "未知文件")
         matched_line = match_info.get("matched_line", "")
         context = match_info.get("context", [])
-        timestamp = match_info.get("timestamp", time.time())
+        # 日志监控器提供的上下文是延迟渲染的函数，只在真正发送时生成
+        if callable(context):
+            context = context()
+        # 匹配信息通常带有时间戳，只在缺失时才读取当前时间
+        timestamp = match_info.get("timestamp")
+        if timestamp is None:
+            timestamp = time.time()
         
         # 转换时间戳为可读格式
-        time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        time_str = self._format_timestamp(timestamp)
         
         # 尝试解析匹配行
         parsed_log = self._parse_log_line(matched_line)
-        structured_message = self._format_structured_message(parsed_log)
         
-        if self.format_type == "html":
-            message = f"<b>⚠️ 关键词告警</b>\n\n"
-            message += f"<b>时间:</b> {time_str}\n"
-            message += f"<b>日志文件:</b> <code>{self.format_text(log_path)}</code>\n\n"
-            
-            # 如果能够解析日志，则使用结构化消息
-            if "raw_message" not in parsed_log:
-                message += f"<b>匹配内容:</b>\n{structured_message}\n\n"
-            else:
-                message += f"<b>匹配内容:</b>\n<pre>{self.format_text(matched_line)}</pre>\n\n"
-            
-            if context:
-                message += f"<b>上下文:</b>\n<pre>"
-                for line in context:
-                    message += f"{self.format_text(line)}\n"
-                message += "</pre>"
-        
-        elif self.format_type == "markdown":
-            message = f"*⚠️ 关键词告警*\n\n"
-            message += f"*时间:* {time_str}\n"
-            message += f"*日志文件:* `{self.format_text(log_path)}`\n\n"
-            
-            # 如果能够解析日志，则使用结构化消息
-            if "raw_message" not in parsed_log:
-                message += f"*匹配内容:*\n{structured_message}\n\n"
-            else:
-                message += f"*匹配内容:*\n```\n{self.format_text(matched_line)}\n```\n\n"
-            
-            if context:
-                message += f"*上下文:*\n```\n"
-                for line in context:
-                    message += f"{self.format_text(line)}\n"
-                message += "```"
+        format_text = self._escape
+        parts = [self._message_header.format(time=time_str, path=format_text(log_path))]
         
+        # 如果能够解析日志，则使用结构化消息
+        if "raw_message" not in parsed_log:
+            parts.append(self._structured_match_template.format(self._format_structured_message(parsed_log)))
         else:
-            # 纯文本格式
-            message = f"⚠️ 关键词告警\n\n"
-            message += f"时间: {time_str}\n"
-            message += f"日志文件: {log_path}\n\n"
-            
-            # 如果能够解析日志，则使用结构化消息
-            if "raw_message" not in parsed_log:
-                message += f"匹配内容:\n{structured_message}\n\n"
-            else:
-                message += f"匹配内容:\n{matched_line}\n\n"
-            
-            if context:
-                message += f"上下文:\n"
-                for line in context:
-                    message += f"{line}\n"
+            parts.append(self._raw_match_template.format(format_text(matched_line)))
+        
+        if context:
+            parts.append(self._context_open)
+            for line in map(format_text, context):
+                parts.append(line)
+                parts.append("\n")
+            parts.append(self._context_close)
         
-        return message
+        return "".join(parts)
 
 class TelegramNotifier:
     """Telegram通知器，用于发送消息到Telegram Bot"""
     
-    def __init__(self, bot_token: str, chat_id: str, parse_mode: str = "HTML"):
+    def __init__(self, bot_token: str, chat_id: str, parse_mode: str = "HTML", pool_size: int = 5):
         """
         初始化Telegram通知器
         
@@ -311,12 +465,15 @@ class TelegramNotifier:
             bot_token: Telegram Bot的token
             chat_id: 接收消息的chat_id
             parse_mode: 消息解析模式，支持"HTML"和"Markdown"
+            pool_size: 连接池保持的最大连接数，应不小于并发发送数
         """
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.parse_mode = parse_mode
         self.api_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
         self.message_formatter = MessageFormatter(parse_mode.lower())
+        # Telegram无法解析消息中的标记时，用纯文本格式重新生成消息后重发
+        self.plain_formatter = MessageFormatter("text")
         
         # 请求超时设置（秒）
         self.timeout = 10
@@ -324,60 +481,150 @@ class TelegramNotifier:
         # 重试设置
         self.max_retries = 3
         self.retry_delay = 2  # 秒
+        
+        # 请求体中与消息文本无关的部分预先序列化，发送时只需拼接消息文本
+        self._payload_prefix = self._serialize_payload_prefix({"chat_id": chat_id, "parse_mode": parse_mode})
+        self._plain_payload_prefix = self._serialize_payload_prefix({"chat_id": chat_id})
+        
+        # 复用HTTP会话，保持与Telegram API的长连接，后续发送无需重新建立TCP/TLS连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        # 请求体都是预先拼接好的JSON，内容类型在会话上设置一次，不必每次请求传入
+        self.session.headers["Content-Type"] = "application/json"
+    
+    @staticmethod
+    def _serialize_payload_prefix(fields: Dict[str, Any]) -> bytes:
+        """
+        序列化请求体的固定字段，得到以text键结尾的JSON前缀
+        
+        Args:
+            fields: 除消息文本外的请求字段
+            
+        Returns:
+            JSON前缀字节串
+        """
+        return json.dumps(fields, ensure_ascii=False)[:-1].encode("utf-8") + b', "text": '
+    
+    def _build_payload(self, text: str, plain: bool = False) -> bytes:
+        """
+        拼接完整的JSON请求体
+        
+        Args:
+            text: 消息文本
+            plain: 是否以纯文本模式发送（不带parse_mode）
+            
+        Returns:
+            UTF-8编码的JSON请求体
+        """
+        prefix = self._plain_payload_prefix if plain else self._payload_prefix
+        # 中文直接以UTF-8传输而不是转义为\uXXXX，请求体更小；无法编码的代理字符转义为JSON的\u转义序列
+        return prefix + json.dumps(text, ensure_ascii=False).encode("utf-8", "backslashreplace") + b"}"
+    
+    @staticmethod
+    def _parse_response(response: requests.Response) -> Dict[str, Any]:
+        """
+        解析Telegram API的响应体
+        
+        Args:
+            response: HTTP响应
+            
+        Returns:
+            响应JSON对象，响应体不是JSON对象时返回空字典
+        """
+        try:
+            result = json.loads(response.content)
+        except ValueError:
+            return {}
+        return result if isinstance(result, dict) else {}
+    
+    def _get_retry_after(self, response: requests.Response) -> float:
+        """
+        从限流响应中获取需要等待的秒数
+        
+        Args:
+            response: HTTP 429响应
+            
+        Returns:
+            等待秒数，无法解析时使用默认重试间隔
+        """
+        retry_after = self._parse_response(response).get("parameters", {}).get("retry_after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except (TypeError, ValueError):
+                pass
+        return self.retry_delay
     
-    def send_message(self, text: str) -> bool:
+    def send_message(self, text: str, plain_text: Optional[Callable[[], str]] = None,
+                     plain: bool = False) -> bool:
         """
         发送消息到Telegram
         
         Args:
             text: 消息文本
+            plain_text: 生成纯文本版本消息的函数，Telegram无法解析标记时用其结果重发；
+                未提供时重发原文本
+            plain: 是否以纯文本模式发送（不带parse_mode）
             
         Returns:
             是否发送成功
         """
-        payload = {
-            "chat_id": self.chat_id,
-            "text": text,
-            "parse_mode": self.parse_mode
-        }
+        payload = self._build_payload(text, plain=plain)
         
         for attempt in range(self.max_retries):
             try:
-                response = requests.post(
+                response = self.session.post(
                     self.api_url,
-                    json=payload,
+                    data=payload,
                     timeout=self.timeout
                 )
                 
-                response.raise_for_status()
-                result = response.json()
+                # 触发Telegram限流时，按照返回的retry_after等待后重试
+                if response.status_code == 429:
+                    retry_after = self._get_retry_after(response)
+                    logger.warning("触发Telegram限流 (尝试 %d/%d)，%s秒后重试", attempt + 1, self.max_retries, retry_after)
+                    if attempt < self.max_retries - 1:
+                        time.sleep(retry_after)
+                        continue
+                    logger.error("达到最大重试次数，放弃发送")
+                    return False
                 
-                if result.get("ok"):
+                # 标记格式错误等请求错误返回400，原因在响应体中，交给下面的错误处理；
+                # 其他错误状态码作为请求错误重试，成功时不需要再检查状态
+                status_code = response.status_code
+                if status_code > 400:
+                    response.raise_for_status()
+                result = self._parse_response(response)
+                
+                if status_code < 300 and result.get("ok"):
                     logger.info("消息发送成功")
                     return True
                 else:
                     error = result.get("description", "未知错误")
-                    logger.error(f"发送消息失败: {error}")
+                    logger.error("发送消息失败: %s", error)
                     
                     # 如果是解析模式错误，尝试以纯文本模式重发
-                    if "parse_mode" in error.lower():
+                    error_lower = error.lower()
+                    if not plain and ("parse_mode" in error_lower or "parse entities" in error_lower):
                         logger.warning("尝试以纯文本模式重发消息")
-                        payload.pop("parse_mode", None)
+                        # 转义后的文本以纯文本发送会带上多余的反斜杠和标签，改用纯文本格式的消息
+                        payload = self._build_payload(plain_text() if plain_text else text, plain=True)
                         
-                        text_response = requests.post(
+                        text_response = self.session.post(
                             self.api_url,
-                            json=payload,
+                            data=payload,
                             timeout=self.timeout
                         )
                         
-                        if text_response.json().get("ok"):
+                        if text_response.status_code < 300 and self._parse_response(text_response).get("ok"):
                             logger.info("以纯文本模式重发消息成功")
                             return True
                     
                     return False
                     
             except requests.RequestException as e:
-                logger.error(f"请求错误 (尝试 {attempt+1}/{self.max_retries}): {e}")
+                logger.error("请求错误 (尝试 %d/%d): %s", attempt + 1, self.max_retries, e)
                 
                 if attempt < self.max_retries - 1:
                     time.sleep(self.retry_delay)
@@ -398,11 +645,33 @@ class TelegramNotifier:
             是否发送成功
         """
         message = self.message_formatter.format_message(match_info)
-        return self.send_message(message)
+        return self.send_message(message, partial(self.plain_formatter.format_message, match_info))
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池中保持的连接"""
+        self.session.close()
+
+# 当前进程中的通知管理器，fork后需要在子进程中重置它们的发送线程和HTTP连接
+_live_managers = weakref.WeakSet()
+
+def _reset_managers_after_fork():
+    """fork后在子进程中重置所有通知管理器，子进程中不存在父进程创建的线程"""
+    for manager in list(_live_managers):
+        manager._reset_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_managers_after_fork)
 
 class NotificationManager:
     """通知管理器，用于协调消息格式化和发送"""
     
+    # 合并多条通知时单条Telegram消息的最大长度（API上限为4096个字符，预留余量）
+    MAX_MESSAGE_LENGTH = 4000
+    # 合并消息中各条通知之间的分隔线
+    MESSAGE_SEPARATOR = "\n———\n"
+    # 等待发送线程发送完通知的默认最长时间（秒）
+    FLUSH_TIMEOUT = 5.0
+    
     def __init__(self, telegram_config: Dict[str, Any]):
         """
         初始化通知管理器
@@ -418,16 +687,84 @@ class NotificationManager:
             logger.error("Telegram配置不完整，无法初始化通知管理器")
             raise ValueError("Telegram配置不完整")
         
-        self.notifier = TelegramNotifier(self.bot_token, self.chat_id, self.parse_mode)
+        # 并发发送的最大线程数，发送耗时主要是网络往返，并发可以缩短一批消息的总耗时
+        self.max_concurrent_sends = max(1, self._get_int_option(telegram_config, "max_concurrent_sends", 5))
         
-        # 消息队列和去重集合
-        self.message_queue = []
-        self.sent_message_hashes = set()
+        self.notifier = TelegramNotifier(self.bot_token, self.chat_id, self.parse_mode,
+                                         pool_size=self.max_concurrent_sends)
         
         # 配置项
-        self.batch_size = telegram_config.get("batch_size", 1)
+        self.batch_size = max(1, self._get_int_option(telegram_config, "batch_size", 1))
         self.deduplicate = telegram_config.get("deduplicate", True)
         self.max_queue_size = 100
+        self.max_sent_hashes = 10000
+        
+        # 发送频率限制（令牌桶）：平均每秒最多发送rate_limit条消息，允许短时间内突发rate_burst条
+        # Telegram对同一聊天大约限制为每秒1条消息，超出后会返回429；rate_limit不大于0时不限制
+        self.rate_limit = self._get_float_option(telegram_config, "rate_limit", 1.0)
+        self.rate_burst = max(1.0, self._get_float_option(telegram_config, "rate_burst", 20.0))
+        self._bucket_tokens = self.rate_burst
+        self._bucket_time = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        
+        # 消息队列，元素为 (消息摘要, 匹配信息)，由添加通知的线程写入、发送线程取出，超过最大长度时自动丢弃最旧的消息
+        self.message_queue = deque(maxlen=self.max_queue_size)
+        # 已发送消息的摘要，按最近使用顺序排列，超过上限时淘汰最久未出现的
+        self.sent_message_hashes = OrderedDict()
+        # 保护去重集合、发送线程和发送线程池的创建，添加通知和发送可能在不同线程中进行
+        self._lock = threading.Lock()
+        
+        # 发送线程和线程池在首次使用时创建，避免守护进程fork前就启动线程
+        self._executor = None
+        self._sender_thread = None
+        self._queue_event = threading.Event()
+        self._closing = False
+        # 关闭时设置，发送线程放弃当前这批中尚未发送的消息
+        self._discard_event = threading.Event()
+        _live_managers.add(self)
+    
+    @staticmethod
+    def _get_float_option(telegram_config: Dict[str, Any], name: str, default: float) -> float:
+        """
+        读取数值类型的配置项，配置值无效时使用默认值
+        
+        Args:
+            telegram_config: Telegram配置字典
+            name: 配置项名称
+            default: 默认值
+            
+        Returns:
+            配置项的值
+        """
+        value = telegram_config.get(name, default)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = math.nan
+        if not math.isfinite(value):
+            logger.warning("无效的配置项 %s: %r，使用默认值: %s", name, telegram_config.get(name), default)
+            return default
+        return value
+    
+    @staticmethod
+    def _get_int_option(telegram_config: Dict[str, Any], name: str, default: int) -> int:
+        """
+        读取整数类型的配置项，配置值无效时使用默认值
+        
+        Args:
+            telegram_config: Telegram配置字典
+            name: 配置项名称
+            default: 默认值
+            
+        Returns:
+            配置项的值
+        """
+        value = telegram_config.get(name, default)
+        try:
+            return int(value)
+        except (TypeError, ValueError, OverflowError):
+            logger.warning("无效的配置项 %s: %r，使用默认值: %s", name, value, default)
+            return default
     
     def add_notification(self, match_info: Dict[str, Any]) -> bool:
         """
@@ -439,53 +776,285 @@ class NotificationManager:
         Returns:
             是否成功添加
         """
-        # 生成消息哈希用于去重
-        msg_hash = hash(f"{match_info.get('log_path')}:{match_info.get('matched_line')}")
+        # 生成消息摘要用于去重，摘要随消息一起入队，发送成功后直接使用
+        msg_hash = _message_key(match_info) if self.deduplicate else None
         
         # 去重检查
-        if self.deduplicate and msg_hash in self.sent_message_hashes:
-            logger.debug("忽略重复消息")
-            return False
+        if self.deduplicate:
+            with self._lock:
+                if msg_hash in self.sent_message_hashes:
+                    self.sent_message_hashes.move_to_end(msg_hash)
+                    logger.debug("忽略重复消息")
+                    return False
+        
+        # 添加到队列，由发送线程异步发送
+        self._enqueue([(msg_hash, match_info)])
+        return True
+    
+    def add_notifications(self, matches: List[Dict[str, Any]]) -> int:
+        """
+        批量添加通知到队列
         
-        # 添加到队列
-        self.message_queue.append(match_info)
+        Args:
+            matches: 匹配信息字典列表
+            
+        Returns:
+            成功添加的数量
+        """
+        if self.deduplicate:
+            sent_hashes = self.sent_message_hashes
+            entries = []
+            with self._lock:
+                for match_info in matches:
+                    msg_hash = _message_key(match_info)
+                    if msg_hash in sent_hashes:
+                        sent_hashes.move_to_end(msg_hash)
+                    else:
+                        entries.append((msg_hash, match_info))
+        else:
+            entries = [(None, match_info) for match_info in matches]
         
-        # 如果队列足够大，立即发送
-        if len(self.message_queue) >= self.batch_size:
-            self.process_queue()
+        # 一次性加入队列，由发送线程异步发送
+        if entries:
+            self._enqueue(entries)
         
-        # 如果队列超过最大大小，移除旧消息
-        if len(self.message_queue) > self.max_queue_size:
-            self.message_queue = self.message_queue[-self.max_queue_size:]
+        return len(entries)
+    
+    def _enqueue(self, entries: List[Tuple[Optional[bytes], Dict[str, Any]]]):
+        """
+        将通知加入队列并唤醒发送线程，调用方不需要等待网络请求完成
         
-        return True
+        Args:
+            entries: (消息摘要, 匹配信息字典) 列表，未启用去重时摘要为None
+        """
+        queue = self.message_queue
+        dropped = len(queue) + len(entries) - self.max_queue_size
+        if dropped > 0:
+            logger.warning("通知队列已满，丢弃最早的 %d 条通知", dropped)
+        queue.extend(entries)
+        
+        # 等待超时的flush之后，原发送线程发送完当前这批消息即退出，需要重新创建；
+        # 多个线程同时添加通知时只创建一个发送线程
+        with self._lock:
+            sender_thread = self._sender_thread
+            if sender_thread is None or not sender_thread.is_alive():
+                self._closing = False
+                self._discard_event.clear()
+                self._sender_thread = threading.Thread(target=self._sender_loop, name="tg-sender", daemon=True)
+                self._sender_thread.start()
+        self._queue_event.set()
+    
+    def _drain_queue(self) -> List[Tuple[Optional[bytes], Dict[str, Any]]]:
+        """
+        取出队列中的所有消息
+        
+        Returns:
+            待发送的 (消息摘要, 匹配信息字典) 列表
+        """
+        queue = self.message_queue
+        pending = []
+        # popleft是原子操作，添加通知的线程可以同时写入队列
+        try:
+            while True:
+                pending.append(queue.popleft())
+        except IndexError:
+            pass
+        return pending
+    
+    def _sender_loop(self):
+        """发送线程主循环，队列中有新消息时取出全部消息批量发送"""
+        queue_event = self._queue_event
+        while True:
+            queue_event.wait()
+            queue_event.clear()
+            
+            # 令牌不足时先等待，等待期间到达的通知会和已有的通知一起取出合并发送
+            delay = self._token_delay()
+            if delay > 0 and not self._closing:
+                time.sleep(delay)
+            
+            pending = self._drain_queue()
+            if pending:
+                try:
+                    sent_count = self._send_batch(pending)
+                    logger.info("已发送 %d/%d 条通知", sent_count, len(pending))
+                except Exception as e:
+                    logger.error("发送通知失败: %s", e)
+            
+            # 关闭时先发送完队列中剩余的消息再退出
+            if self._closing:
+                break
     
     def process_queue(self) -> int:
         """
-        处理消息队列
+        在当前线程中立即发送队列中的消息
         
+        Returns:
+            成功发送的消息数量
+        """
+        pending = self._drain_queue()
+        if not pending:
+            return 0
+        return self._send_batch(pending)
+    
+    def _send_batch(self, pending) -> int:
+        """
+        发送一批消息，并记录发送成功的消息用于去重
+        
+        Args:
+            pending: 待发送的 (消息摘要, 匹配信息字典) 序列
+            
         Returns:
             成功发送的消息数量
         """
         success_count = 0
+        batches = self._combine_messages(pending)
+        
+        # 多条消息并发发送，总耗时约为单次网络往返而不是逐条累加
+        if len(batches) == 1 or self.max_concurrent_sends == 1:
+            results = [self._send_combined(text, items) for text, items in batches]
+        else:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrent_sends,
+                        thread_name_prefix="tg-send"
+                    )
+            results = list(self._executor.map(self._send_combined, *zip(*batches)))
         
-        while self.message_queue:
-            match_info = self.message_queue.pop(0)
+        sent_hashes = self.sent_message_hashes
+        for (_, items), sent in zip(batches, results):
+            if not sent:
+                continue
+            success_count += len(items)
             
-            if self.notifier.send_notification(match_info):
-                success_count += 1
-                
-                # 添加到已发送集合
-                if self.deduplicate:
-                    msg_hash = hash(f"{match_info.get('log_path')}:{match_info.get('matched_line')}")
-                    self.sent_message_hashes.add(msg_hash)
-                
-                # 限制已发送集合大小
-                if len(self.sent_message_hashes) > 10000:
-                    self.sent_message_hashes = set(list(self.sent_message_hashes)[-5000:])
+            # 合并消息发送成功后才将其中的通知添加到已发送集合，超过上限时淘汰最久未出现的消息
+            if self.deduplicate:
+                with self._lock:
+                    for msg_hash, _ in items:
+                        sent_hashes[msg_hash] = None
+                        sent_hashes.move_to_end(msg_hash)
+                        if len(sent_hashes) > self.max_sent_hashes:
+                            sent_hashes.popitem(last=False)
         
         return success_count
     
+    def _send_combined(self, text: str, items: List[Tuple[Optional[bytes], Dict[str, Any]]]) -> bool:
+        """
+        发送一条合并后的消息
+        
+        Args:
+            text: 合并后的消息文本
+            items: 消息中包含的 (消息摘要, 匹配信息字典) 列表
+            
+        Returns:
+            是否发送成功
+        """
+        if not self._acquire_send_token():
+            return False
+        
+        if len(text) > self.MAX_MESSAGE_LENGTH:
+            # 只有单条通知本身超过长度上限时才会出现，截断标记文本可能破坏标签，改为发送截断后的纯文本
+            plain_text = self._combine_plain_messages(items)
+            if len(plain_text) > self.MAX_MESSAGE_LENGTH:
+                plain_text = plain_text[:self.MAX_MESSAGE_LENGTH - 1] + "…"
+            return self.notifier.send_message(plain_text, plain=True)
+        
+        return self.notifier.send_message(text, partial(self._combine_plain_messages, items))
+    
+    def _refill_tokens(self) -> float:
+        """
+        按经过的时间补充令牌，调用方需持有_bucket_lock
+        
+        Returns:
+            当前令牌数，已被预占时可能为负数
+        """
+        now = time.monotonic()
+        tokens = min(self.rate_burst, self._bucket_tokens + (now - self._bucket_time) * self.rate_limit)
+        self._bucket_tokens = tokens
+        self._bucket_time = now
+        return tokens
+    
+    def _token_delay(self) -> float:
+        """
+        计算距离令牌桶中有可用令牌还需要等待的时间
+        
+        Returns:
+            等待时间（秒），有可用令牌或不限制频率时为0
+        """
+        if self.rate_limit <= 0:
+            return 0.0
+        with self._bucket_lock:
+            tokens = self._refill_tokens()
+        return max(0.0, (1 - tokens) / self.rate_limit)
+    
+    def _acquire_send_token(self) -> bool:
+        """
+        从令牌桶中取出一个令牌，令牌不足时等待补充，并发发送的线程各自预占令牌后等待
+        
+        Returns:
+            是否可以发送，关闭时丢弃未发送的通知则返回False
+        """
+        if self.rate_limit <= 0:
+            return not self._discard_event.is_set()
+        with self._bucket_lock:
+            tokens = self._refill_tokens() - 1
+            self._bucket_tokens = tokens
+        if tokens < 0:
+            return not self._discard_event.wait(-tokens / self.rate_limit)
+        return not self._discard_event.is_set()
+    
+    def _combine_plain_messages(self, items: List[Tuple[Optional[bytes], Dict[str, Any]]]) -> str:
+        """
+        生成合并消息的纯文本版本，在Telegram无法解析消息标记或消息过长时使用
+        
+        Args:
+            items: 消息中包含的 (消息摘要, 匹配信息字典) 列表
+            
+        Returns:
+            纯文本消息
+        """
+        format_message = self.notifier.plain_formatter.format_message
+        return self.MESSAGE_SEPARATOR.join(format_message(match_info) for _, match_info in items)
+    
+    def _combine_messages(self, pending) -> List[Tuple[str, List[Tuple[Optional[bytes], Dict[str, Any]]]]]:
+        """
+        格式化待发送的通知，并将最多batch_size条通知合并为一条消息，减少API调用次数
+        
+        Args:
+            pending: 待发送的 (消息摘要, 匹配信息字典) 序列
+            
+        Returns:
+            [(消息文本, 消息中包含的 (消息摘要, 匹配信息字典) 列表)]
+        """
+        format_message = self.notifier.message_formatter.format_message
+        batch_size = max(1, self.batch_size)
+        separator = self.MESSAGE_SEPARATOR
+        
+        batches = []
+        texts = []
+        items = []
+        length = 0
+        for entry in pending:
+            text = format_message(entry[1])
+            # 超过合并条数或长度上限时结束当前消息；单条通知本身超过上限时仍单独发送
+            if items and (len(items) >= batch_size
+                          or length + len(separator) + len(text) > self.MAX_MESSAGE_LENGTH):
+                batches.append((separator.join(texts), items))
+                texts = []
+                items = []
+                length = 0
+            if items:
+                length += len(separator)
+            texts.append(text)
+            items.append(entry)
+            length += len(text)
+        
+        if items:
+            batches.append((separator.join(texts), items))
+        
+        return batches
+    
     def test_notification(self, message: str = "测试消息") -> bool:
         """
         发送测试通知
@@ -503,4 +1072,81 @@ class NotificationManager:
             "timestamp": time.time()
         }
         
-        return self.notifier.send_notification(match_info) 
\ No newline at end of file
+        return self.notifier.send_notification(match_info)
+    
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        """
+        发送完队列中的通知后停止发送线程，之后添加通知时会重新启动发送线程
+        
+        Args:
+            timeout: 最多等待的秒数，为None时一直等待到发送完成
+            
+        Returns:
+            是否在限定时间内发送完成
+        """
+        return self._stop_sender(timeout)
+    
+    def _stop_sender(self, timeout: Optional[float] = None) -> bool:
+        """
+        通知发送线程发送完队列中剩余的消息后退出，然后关闭线程池
+        
+        Args:
+            timeout: 等待发送线程结束的最长秒数，为None时一直等待
+            
+        Returns:
+            发送线程是否已经结束
+        """
+        sender_thread = self._sender_thread
+        if sender_thread is not None:
+            self._closing = True
+            self._queue_event.set()
+            sender_thread.join(timeout)
+            if sender_thread.is_alive():
+                # 发送线程发送完当前这批消息后自行退出，线程池仍在使用中，不能关闭
+                logger.warning("发送线程未能在 %s 秒内发送完通知，队列中还有 %d 条未取出", timeout, len(self.message_queue))
+                return False
+            with self._lock:
+                if self._sender_thread is sender_thread:
+                    self._sender_thread = None
+                    self._closing = False
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return True
+    
+    def _reset_after_fork(self):
+        """
+        在fork出的子进程中重置发送线程、线程池和锁，并关闭继承的HTTP连接
+        
+        子进程中不存在父进程的线程，锁可能在fork时正被其他线程持有，都需要重新创建；
+        守护进程会关闭所有继承的描述符，连接池中的连接必须在此之前关闭，会话之后仍可使用。
+        """
+        self._lock = threading.Lock()
+        self._bucket_lock = threading.Lock()
+        self._queue_event = threading.Event()
+        self._discard_event = threading.Event()
+        self._sender_thread = None
+        self._executor = None
+        self._closing = False
+        self.notifier.close()
+    
+    def close(self, drain: bool = False, timeout: Optional[float] = FLUSH_TIMEOUT):
+        """
+        关闭发送线程、线程池和HTTP会话
+        
+        关闭通常发生在收到停止信号时，默认丢弃队列中尚未发送的通知，只等待正在发送的消息完成。
+        
+        Args:
+            drain: 是否先发送完队列中剩余的通知
+            timeout: 等待发送线程结束的最长秒数，为None时一直等待
+        """
+        if not drain:
+            self._discard_event.set()
+            dropped = len(self._drain_queue())
+            if dropped:
+                logger.warning("通知管理器已关闭，丢弃 %d 条未发送的通知", dropped)
+        
+        # 发送线程仍在发送时不关闭HTTP会话，进程退出时连接随之关闭
+        if self._stop_sender(timeout):
+            self.notifier.close() 
\ No newline at end of file
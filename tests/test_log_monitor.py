@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""日志监控模块测试"""
+
+import re
+
+import pytest
+
+from src import log_monitor
+from src.log_monitor import (KeywordMatcher, LogReader, _compile_multiline_scan_pattern,
+                             _extract_required_literal)
+
+MULTILINE_DATA = b"\n".join([
+    b"  orphan continuation",
+    b"2025-03-28 10:15:23 ERROR first",
+    b"Traceback (most recent call last):",
+    b"    at foo",
+    b"",
+    b"2025-03-28 10:15:24 INFO second",
+    b"[main] bracketed start",
+    b"xx ERROR inline",
+    b"\tindented",
+    b"2025-03-28 10:15:25 WARN third",
+])
+
+MULTILINE_PATTERNS = [
+    rb"\d{4}-\d{2}-\d{2}",
+    rb"\[\w+\]",
+    rb"[0-9]{4}|\[",
+    rb"\s*\d",
+    rb"\s+",
+    rb"[^x]",
+    rb"\D",
+    rb".*ERROR",
+    rb"(?s).*ERROR",
+    rb"\d.*$",
+    rb"\A\d",
+    rb"(?<=\n)\d",
+    rb"\d(?=.*\n)",
+    rb"(?i)(?:info|warn)",
+    rb"\bTrace",
+]
+
+MATCHER_LINES = [
+    b"2025-03-28 10:15:23 ERROR database connection lost",
+    b"2025-03-28 10:15:24 INFO all good",
+    b"2025-03-28 10:15:25 WARN disk usage 91%",
+    b"FATAL: out of memory",
+    b"timeout after 30s",
+    b"Exception in thread main",
+    "2025-03-28 10:15:26 错误 任务３失败".encode("utf-8"),
+    b"",
+    b"errorless lowercase error",
+]
+
+PLAIN_KEYWORDS = ["ERROR", "FATAL", "Exception", "timeout", "错误", "WARN"]
+
+def _make_reader(pattern: bytes) -> LogReader:
+    """创建只用于切分多行日志的读取器"""
+    return LogReader("unused.log", multiline_pattern=re.compile(pattern))
+
+@pytest.mark.parametrize("pattern", MULTILINE_PATTERNS)
+def test_multiline_scan_matches_per_line_split(pattern):
+    """整块扫描切分与逐行匹配切分得到相同的日志记录"""
+    reader = _make_reader(pattern)
+    expected = reader._process_multiline_logs(MULTILINE_DATA.split(b"\n"))
+    
+    records = reader._split_multiline_records(MULTILINE_DATA)
+    if records is not None:
+        assert records == expected
+
+@pytest.mark.parametrize("pattern", [rb"\s*\d", rb"[^x]", rb"\D", rb"(?s).*ERROR", rb"\d.*$",
+                                     rb"\A\d", rb"(?<=\n)\d", rb"\d(?=.*\n)"])
+def test_multiline_scan_rejects_cross_line_patterns(pattern):
+    """可能跨行匹配或依赖相邻行的起始模式不用于整块扫描"""
+    assert _compile_multiline_scan_pattern(pattern, 0) is None
+
+@pytest.mark.parametrize("pattern", [rb"\d{4}-\d{2}-\d{2}", rb"\[\w+\]", rb".*ERROR", rb"\bTrace"])
+def test_multiline_scan_accepts_line_local_patterns(pattern):
+    """只在一行之内匹配的起始模式使用整块扫描"""
+    assert _compile_multiline_scan_pattern(pattern, 0) is not None
+
+def test_read_new_lines_merges_multiline_records(tmp_path):
+    """读取新内容时按起始模式合并多行日志，未写完的最后一行留到下次读取"""
+    log_file = tmp_path / "app.log"
+    log_file.write_bytes(MULTILINE_DATA + b"\n2025-03-28 10:15:26 partial")
+    reader = LogReader(str(log_file), multiline_pattern=re.compile(rb"\d{4}-\d{2}-\d{2}"))
+    
+    assert reader.check_file_changed()
+    records = reader.read_new_lines()
+    assert records == reader._process_multiline_logs(MULTILINE_DATA.split(b"\n"))
+    assert records[1].startswith(b"2025-03-28 10:15:23 ERROR first\nTraceback")
+    
+    with open(log_file, "ab") as f:
+        f.write(b" done\n")
+    assert reader.check_file_changed()
+    assert reader.read_new_lines() == [b"2025-03-28 10:15:26 partial done"]
+    reader.close()
+
+@pytest.mark.parametrize("keywords", [PLAIN_KEYWORDS[:2], PLAIN_KEYWORDS])
+def test_plain_keywords_match_like_substring_search(keywords):
+    """关键词较多时使用自动机匹配，结果与逐个in检查一致"""
+    matcher = KeywordMatcher(keywords)
+    uses_automaton = (log_monitor.ahocorasick is not None
+                      and len(keywords) >= KeywordMatcher.AUTOMATON_MIN_KEYWORDS)
+    assert (matcher.automaton is not None) == uses_automaton
+    
+    for line in MATCHER_LINES:
+        expected = any(keyword.encode("utf-8") in line for keyword in keywords)
+        assert matcher.match(line) == expected, line
+
+REGEX_KEYWORD_SETS = [
+    ["ERROR", "FATAL"],
+    [r"ERROR \w+", r"disk usage \d+%"],
+    [r"(?i)exception", r"timeout after \d+s"],
+    [r"错误.*\d", r"^FATAL"],
+    [r"(\w+)less lowercase \1", r"WARN"],
+    [r"\bERROR\b", r"[A-Z]{5}:"],
+]
+
+@pytest.mark.parametrize("keywords", REGEX_KEYWORD_SETS)
+def test_regex_keywords_match_like_per_pattern_search(keywords):
+    """合并后的正则与逐个搜索解码后日志行的结果一致"""
+    matcher = KeywordMatcher(keywords, use_regex=True)
+    # 含编号反向引用或内联全局标志的正则无法合并，回退为逐个搜索
+    combinable = not any(re.search(r"\\[1-9]|^\(\?[a-z]+\)", keyword) for keyword in keywords)
+    assert (matcher.combined_pattern is not None) == combinable
+    
+    for line in MATCHER_LINES:
+        text = line.decode("utf-8")
+        expected = any(re.search(keyword, text) for keyword in keywords)
+        assert matcher.match(line) == expected, line
+
+@pytest.mark.parametrize("pattern, literal", [
+    (r"ERROR \w+", b"ERROR "),
+    (r"disk usage \d+%", b"disk usage "),
+    (r"错误.*\d", "错误".encode("utf-8")),
+    (r"(?i)exception", None),
+    (r"\d+ms", None),
+    (r"ab|cd", None),
+    (rb"timeout after \d+s", b"timeout after "),
+])
+def test_extract_required_literal(pattern, literal):
+    """必需字面量取顶层最长的连续普通字符，字符串正则按UTF-8编码"""
+    assert _extract_required_literal(re.compile(pattern)) == literal
+
+def test_prefilter_only_skips_lines_that_cannot_match():
+    """预过滤排除的行一定不匹配任何正则"""
+    keywords = [r"ERROR \w+", r"disk usage \d+%", r"错误.*\d"]
+    matcher = KeywordMatcher(keywords, use_regex=True)
+    assert matcher.prefilter_literals == [b"ERROR ", b"disk usage ", "错误".encode("utf-8")]
+    
+    for line in MATCHER_LINES:
+        if not matcher._contains_literal(line, matcher.prefilter_literals, matcher.prefilter_automaton):
+            assert not any(re.search(keyword, line.decode("utf-8")) for keyword in keywords), line
+
+@pytest.mark.parametrize("keywords", [PLAIN_KEYWORDS[:2], PLAIN_KEYWORDS])
+def test_candidate_lines_match_per_line_scan(keywords):
+    """在整块数据上查找的候选行与逐行检查的结果一致，上下文窗口与按行截取的结果一致"""
+    matcher = KeywordMatcher(keywords)
+    data = b"\n".join(MATCHER_LINES)
+    lines = data.split(b"\n")
+    
+    spans = matcher.find_candidate_lines(data, matcher.get_scan_literals())
+    
+    expected = [i for i, line in enumerate(lines) if matcher.match(line)]
+    assert [data[start:end] for start, end in spans] == [lines[i] for i in expected]
+    for (start, end), i in zip(spans, expected):
+        window, index = matcher.get_context_window(data, start, end)
+        first = max(0, i - 2)
+        assert window == lines[first:i + 3]
+        assert index == i - first
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""日志处理器测试"""
+
+import logging
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.main import StandardizedFileHandler
+
+def _record(level, message):
+    return logging.LogRecord("tg_notification", level, __file__, 1, message, None, None)
+
+def _wait_for_child(pid, timeout=5.0):
+    """等待子进程退出，超时则杀死子进程并返回None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.02)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+    return None
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="需要os.register_at_fork")
+def test_handler_can_write_in_child_forked_while_locked(tmp_path):
+    """fork时写入锁被其他线程持有，子进程中重新创建锁后仍可以写入日志，不会死锁"""
+    handler = StandardizedFileHandler(str(tmp_path), "test", "all")
+    handler.handle(_record(logging.WARNING, "parent"))
+    
+    locked = threading.Event()
+    release = threading.Event()
+    
+    def hold_lock():
+        with handler._write_lock, handler._thread_buffers_lock:
+            locked.set()
+            release.wait(5)
+    
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait(5)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                handler.handle(_record(logging.WARNING, "child"))
+                handler.close()
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+    finally:
+        release.set()
+        holder.join()
+    
+    assert _wait_for_child(pid) == 0
+    handler.close()
+    
+    content = open(handler.baseFilename, encoding="utf-8").read()
+    assert "parent" in content
+    assert "child" in content
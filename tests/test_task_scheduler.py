@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""任务调度器测试"""
+
+import threading
+
+import pytest
+
+from src.task_scheduler import TaskScheduler
+
+@pytest.fixture
+def scheduler():
+    """调度间隔很短的调度器，测试结束时关闭线程池"""
+    scheduler = TaskScheduler(interval=0.2)
+    yield scheduler
+    if scheduler._executor is not None:
+        scheduler._executor.shutdown(wait=True)
+
+def test_single_task_runs_inline(scheduler):
+    """只有一个任务时直接在调度线程中执行，不创建线程池"""
+    threads = []
+    scheduler.add_task(lambda: threads.append(threading.current_thread()))
+    
+    scheduler._run_tasks()
+    
+    assert threads == [threading.current_thread()]
+    assert scheduler._executor is None
+    assert scheduler.execution_count == 1
+
+def test_multiple_tasks_run_in_parallel(scheduler):
+    """多个任务并行执行：两个任务互相等待，只有同时运行时才能都通过屏障"""
+    barrier = threading.Barrier(2, timeout=2)
+    scheduler.add_task(barrier.wait, "a")
+    scheduler.add_task(barrier.wait, "b")
+    
+    scheduler._run_tasks()
+    
+    assert scheduler.execution_count == 2
+    assert scheduler.error_count == 0
+    assert list(scheduler.task_execution_counts) == [1, 1]
+
+def test_failed_task_is_counted(scheduler):
+    """并行执行时任务的异常计入错误数，不影响其他任务"""
+    def fail():
+        raise RuntimeError("boom")
+    
+    scheduler.add_task(fail, "fail")
+    scheduler.add_task(lambda: None, "ok")
+    
+    scheduler._run_tasks()
+    
+    assert scheduler.execution_count == 1
+    assert scheduler.error_count == 1
+    assert list(scheduler.task_error_counts) == [1, 0]
+
+def test_slow_task_does_not_block_others(scheduler, caplog):
+    """慢任务超过调度间隔时不阻塞其他任务，仍在执行时下一轮不会重复提交"""
+    release = threading.Event()
+    slow_calls = []
+    fast_calls = []
+    
+    def slow():
+        slow_calls.append(1)
+        release.wait(5)
+    
+    scheduler.add_task(slow, "slow")
+    scheduler.add_task(lambda: fast_calls.append(1), "fast")
+    
+    scheduler._run_tasks()
+    assert fast_calls == [1]
+    assert scheduler.execution_count == 1
+    assert scheduler._task_futures[0] is not None
+    
+    with caplog.at_level("WARNING", logger="tg_notification"):
+        scheduler._run_tasks()
+    assert slow_calls == [1]
+    assert fast_calls == [1, 1]
+    assert "上一次执行尚未完成" in caplog.text
+    
+    release.set()
+    scheduler._task_futures[0].result(timeout=2)
+    scheduler._run_tasks()
+    assert slow_calls == [1, 1]
+    # 上一轮未汇总的慢任务结果在再次提交前计入
+    assert scheduler.execution_count == 5
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""Telegram通知模块测试"""
+
+import json
+import random
+import re
+import threading
+import time
+
+import pytest
+import requests
+
+from src import telegram_notifier
+from src.telegram_notifier import (MessageFormatter, NotificationManager, TelegramNotifier,
+                                  _parse_simple_log_line)
+
+TIMESTAMP = 1700000000.0
+TIME_TEXT = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(TIMESTAMP))
+
+# 改为按位置解析之前使用的正则表达式
+SIMPLE_LOG_REGEX = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ([A-Z]+) (.+)$')
+
+SIMPLE_LOG_LINES = [
+    "2023-07-01 10:15:38 ERROR 消息内容",
+    "2023-07-01 10:15:38 ERROR message with trailing newline\n",
+    "2023-07-01 10:15:38 ERROR two\nlines",
+    "2023-07-01 10:15:38 ERROR \n",
+    "2023-07-01 10:15:38 ERROR ",
+    "2023-07-01 10:15:38 ERROR",
+    "2023-07-01 10:15:38  ERROR double space",
+    "2023-07-01 10:15:38 Error mixed case",
+    "2023-07-01 10:15:38 ÉRROR non-ascii level",
+    "2023-07-01 10:15:38 ERROR1 digit in level",
+    "２０２３-０７-０１ １０:１５:３８ ERROR full-width digits",
+    "2023-07-01T10:15:38 ERROR iso separator",
+    "2023-07-01 10:15:38.123 [INFO] [main] [TX1] [PID1] standard",
+    "[2023-07-01 10:15:38] [system] [INFO] bracketed",
+    "2023-7-01 10:15:38 ERROR short month",
+    "",
+]
+
+def _parse_with_regex(line):
+    match = SIMPLE_LOG_REGEX.match(line)
+    if match is None:
+        return None
+    return {"timestamp": match.group(1), "log_level": match.group(2), "message": match.group(3)}
+
+@pytest.mark.parametrize("line", SIMPLE_LOG_LINES)
+def test_parse_simple_log_line_matches_regex(line):
+    """按位置解析的结果与原来的正则表达式一致"""
+    assert _parse_simple_log_line(line) == _parse_with_regex(line)
+
+def test_parse_simple_log_line_matches_regex_on_random_lines():
+    """在随机改动的日志行上与原来的正则表达式一致"""
+    rng = random.Random(0)
+    alphabet = "0123456789-: \nABZaz[]é３"
+    base = "2023-07-01 10:15:38 ERROR msg"
+    for _ in range(5000):
+        chars = list(base)
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(chars) + 1)
+            operation = rng.random()
+            if operation < 0.4 and position < len(chars):
+                chars[position] = rng.choice(alphabet)
+            elif operation < 0.7:
+                chars.insert(position, rng.choice(alphabet))
+            elif position < len(chars):
+                del chars[position]
+        line = "".join(chars)
+        assert _parse_simple_log_line(line) == _parse_with_regex(line), repr(line)
+
+STANDARD_MATCH = {
+    "log_path": "/var/log/app.log",
+    "matched_line": "2025-03-28 10:15:23.456 [ERROR] [main] [TX1] [PID9] a<b>",
+    "timestamp": TIMESTAMP,
+}
+
+RAW_MATCH = {
+    "log_path": "/var/log/app_1.log",
+    "matched_line": "raw <line> a_b",
+    "context": ["before & after", "raw <line> a_b"],
+    "timestamp": TIMESTAMP,
+}
+
+@pytest.mark.parametrize("format_type, match_info, expected", [
+    ("html", STANDARD_MATCH,
+     f"<b>⚠️ 关键词告警</b>\n\n<b>时间:</b> {TIME_TEXT}\n<b>日志文件:</b> <code>/var/log/app.log</code>\n\n"
+     "<b>匹配内容:</b>\n🔴 <b>ERROR</b>\n\n<b>时间:</b> 2025-03-28 10:15:23.456\n<b>线程:</b> main\n"
+     "<b>事务ID:</b> TX1\n<b>PID:</b> PID9\n\n<b>消息:</b>\n<pre>a&lt;b&gt;</pre>\n\n"),
+    ("html", RAW_MATCH,
+     f"<b>⚠️ 关键词告警</b>\n\n<b>时间:</b> {TIME_TEXT}\n<b>日志文件:</b> <code>/var/log/app_1.log</code>\n\n"
+     "<b>匹配内容:</b>\n<pre>raw &lt;line&gt; a_b</pre>\n\n"
+     "<b>上下文:</b>\n<pre>before &amp; after\nraw &lt;line&gt; a_b\n</pre>"),
+    ("markdown", STANDARD_MATCH,
+     f"*⚠️ 关键词告警*\n\n*时间:* {TIME_TEXT}\n*日志文件:* `/var/log/app\\.log`\n\n"
+     "*匹配内容:*\n🔴 *ERROR*\n\n*时间:* 2025\\-03\\-28 10:15:23\\.456\n*线程:* main\n"
+     "*事务ID:* TX1\n*PID:* PID9\n\n*消息:*\n```\na<b\\>\n```\n\n"),
+    ("markdown", RAW_MATCH,
+     f"*⚠️ 关键词告警*\n\n*时间:* {TIME_TEXT}\n*日志文件:* `/var/log/app\\_1\\.log`\n\n"
+     "*匹配内容:*\n```\nraw <line\\> a\\_b\n```\n\n"
+     "*上下文:*\n```\nbefore & after\nraw <line\\> a\\_b\n```"),
+    ("text", RAW_MATCH,
+     f"⚠️ 关键词告警\n\n时间: {TIME_TEXT}\n日志文件: /var/log/app_1.log\n\n"
+     "匹配内容:\nraw <line> a_b\n\n上下文:\nbefore & after\nraw <line> a_b\n"),
+])
+def test_format_message_templates(format_type, match_info, expected):
+    """模块级模板拼出的消息与原来逐段拼接的消息一致"""
+    assert MessageFormatter(format_type).format_message(match_info) == expected
+
+class RecordingEvent(threading.Event):
+    """记录等待时间而不真正等待的事件，用于检查令牌桶的等待时长"""
+    
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+    
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return self.is_set()
+
+@pytest.fixture
+def make_manager():
+    """创建通知管理器，测试结束时关闭"""
+    managers = []
+    
+    def make(**options):
+        manager = NotificationManager(dict({"bot_token": "token", "chat_id": "1"}, **options))
+        managers.append(manager)
+        return manager
+    
+    yield make
+    for manager in managers:
+        manager.close()
+
+def test_token_bucket_allows_burst_then_waits(make_manager):
+    """突发额度内的消息立即发送，之后每条消息等待令牌补充"""
+    manager = make_manager(rate_limit=10, rate_burst=2)
+    manager._discard_event = RecordingEvent()
+    
+    assert manager._token_delay() == 0
+    assert manager._acquire_send_token()
+    assert manager._acquire_send_token()
+    assert manager._discard_event.waits == []
+    assert manager._token_delay() > 0
+    
+    assert manager._acquire_send_token()
+    assert manager._acquire_send_token()
+    # 令牌被预占为负数，后一个发送需要等待更久
+    first, second = manager._discard_event.waits
+    assert 0 < first <= 0.1
+    assert first < second <= 0.2
+
+def test_token_bucket_disabled_and_discarded(make_manager):
+    """rate_limit不大于0时不限制频率；关闭时丢弃等待中的发送"""
+    manager = make_manager(rate_limit=0)
+    assert all(manager._acquire_send_token() for _ in range(100))
+    assert manager._token_delay() == 0
+    
+    manager = make_manager(rate_limit=10, rate_burst=1)
+    manager._discard_event = RecordingEvent()
+    assert manager._acquire_send_token()
+    manager._discard_event.set()
+    assert not manager._acquire_send_token()
+
+@pytest.mark.parametrize("options, expected", [
+    ({"rate_limit": "abc", "rate_burst": None}, (1.0, 20.0, 5, 1)),
+    ({"rate_limit": "nan", "rate_burst": "inf"}, (1.0, 20.0, 5, 1)),
+    ({"max_concurrent_sends": "x", "batch_size": []}, (1.0, 20.0, 5, 1)),
+    ({"max_concurrent_sends": 0, "batch_size": -3, "rate_burst": 0}, (1.0, 1.0, 1, 1)),
+    ({"rate_limit": "2.5", "rate_burst": "4", "max_concurrent_sends": "3", "batch_size": 10},
+     (2.5, 4.0, 3, 10)),
+])
+def test_invalid_options_fall_back_to_defaults(make_manager, options, expected):
+    """无效的频率限制和并发配置使用默认值，不会导致初始化失败"""
+    manager = make_manager(**options)
+    assert (manager.rate_limit, manager.rate_burst, manager.max_concurrent_sends, manager.batch_size) == expected
+
+class RecordingSender:
+    """替代TelegramNotifier.send_message，记录发送的消息，可以指定失败的发送"""
+    
+    def __init__(self, fail_when=None):
+        self.fail_when = fail_when
+        self.sent = []
+        self._lock = threading.Lock()
+    
+    def __call__(self, text, plain_text=None, plain=False):
+        with self._lock:
+            self.sent.append((text, plain))
+        return not (self.fail_when and self.fail_when(text))
+
+def _matches(count, line_length=0):
+    return [{"log_path": "/var/log/app.log", "matched_line": f"ERROR {i} " + "x" * line_length,
+             "timestamp": TIMESTAMP} for i in range(count)]
+
+def test_notifications_are_merged_up_to_batch_size(make_manager):
+    """最多batch_size条通知合并为一条消息，发送成功的通知不会再次发送"""
+    manager = make_manager(batch_size=3, rate_limit=0)
+    sender = RecordingSender()
+    manager.notifier.send_message = sender
+    
+    assert manager.add_notifications(_matches(7)) == 7
+    assert manager.flush()
+    
+    counts = sorted(text.count("关键词告警") for text, _ in sender.sent)
+    assert counts == [1, 3, 3]
+    for text, _ in sender.sent:
+        assert text.count(manager.MESSAGE_SEPARATOR) == text.count("关键词告警") - 1
+    assert manager.add_notifications(_matches(7)) == 0
+
+def test_failed_batch_is_not_marked_as_sent(make_manager):
+    """发送失败的合并消息中的通知不计入已发送，之后可以再次添加"""
+    manager = make_manager(batch_size=2, rate_limit=0, max_concurrent_sends=1)
+    sender = RecordingSender(fail_when=lambda text: "ERROR 0 " in text)
+    manager.notifier.send_message = sender
+    
+    manager.add_notifications(_matches(4))
+    assert manager.flush()
+    
+    assert len(sender.sent) == 2
+    assert manager.add_notifications(_matches(4)) == 2
+
+def test_long_notifications_are_not_merged(make_manager):
+    """合并后超过消息长度上限时分开发送，单条超长的通知截断后以纯文本发送"""
+    manager = make_manager(batch_size=10, rate_limit=0, max_concurrent_sends=1)
+    sender = RecordingSender()
+    manager.notifier.send_message = sender
+    
+    assert manager.process_queue() == 0
+    manager.message_queue.extend((None, match_info) for match_info in _matches(2, 3000))
+    manager.message_queue.extend((None, match_info) for match_info in _matches(1, 5000))
+    assert manager.process_queue() == 3
+    
+    assert len(sender.sent) == 3
+    assert all(len(text) <= manager.MAX_MESSAGE_LENGTH for text, _ in sender.sent)
+    assert [plain for _, plain in sender.sent] == [False, False, True]
+    assert sender.sent[2][0].endswith("…")
+
+def _response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+class FakeSession:
+    """按顺序返回预设响应的HTTP会话，记录每次请求的请求体"""
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.payloads = []
+    
+    def post(self, url, data=None, timeout=None):
+        self.payloads.append(json.loads(data))
+        return self.responses.pop(0)
+    
+    def close(self):
+        pass
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录重试前的等待时间而不真正等待"""
+    recorded = []
+    monkeypatch.setattr(telegram_notifier.time, "sleep", recorded.append)
+    return recorded
+
+def _make_notifier(responses):
+    notifier = TelegramNotifier("token", "1")
+    notifier.session.close()
+    notifier.session = FakeSession(responses)
+    return notifier
+
+def test_rate_limited_request_is_retried_after_retry_after(sleeps):
+    """收到429时按retry_after等待后重试"""
+    notifier = _make_notifier([
+        _response(429, {"ok": False, "parameters": {"retry_after": 7}}),
+        _response(200, {"ok": True}),
+    ])
+    
+    assert notifier.send_message("<b>告警</b>")
+    assert sleeps == [7.0]
+    assert len(notifier.session.payloads) == 2
+    assert notifier.session.payloads[1] == {"chat_id": "1", "parse_mode": "HTML", "text": "<b>告警</b>"}
+
+def test_rate_limited_request_gives_up_after_max_retries(sleeps):
+    """一直收到429时达到最大重试次数后放弃，没有retry_after时使用默认间隔"""
+    notifier = _make_notifier([_response(429, {"ok": False})] * 3)
+    
+    assert not notifier.send_message("告警")
+    assert sleeps == [notifier.retry_delay] * 2
+    assert len(notifier.session.payloads) == 3
+
+def test_unparsable_markup_is_resent_as_plain_text(sleeps):
+    """Telegram无法解析标记时返回400，改用纯文本格式的消息并去掉parse_mode后重发"""
+    notifier = _make_notifier([
+        _response(400, {"ok": False, "description": "Bad Request: can't parse entities: unclosed tag"}),
+        _response(200, {"ok": True}),
+    ])
+    
+    assert notifier.send_notification(RAW_MATCH)
+    
+    first, second = notifier.session.payloads
+    assert first["parse_mode"] == "HTML"
+    assert "parse_mode" not in second
+    assert second["text"] == MessageFormatter("text").format_message(RAW_MATCH)
+    assert sleeps == []
+
+def test_other_request_errors_are_not_resent(sleeps):
+    """其他原因的400错误不重发"""
+    notifier = _make_notifier([_response(400, {"ok": False, "description": "Bad Request: chat not found"})])
+    
+    assert not notifier.send_message("告警", lambda: "plain")
+    assert len(notifier.session.payloads) == 1